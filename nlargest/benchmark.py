@@ -1,40 +1,91 @@
 #!/usr/bin/env python3
-"""Benchmark functions, print result to screen and optionally save to permanent
-pickled storage."""
+"""Benchmark functions, print result to screen and optionally save to an
+appendable results file, or compare two saved runs."""
 import argparse
+import concurrent.futures
 import configparser
 import functools
+import hashlib
 import importlib
+import inspect
 import itertools
+import json
 import logging
+import multiprocessing
 import os
-import pickle
+import platform
 import subprocess
 import sys
+import timeit
 from collections import namedtuple
 from datetime import datetime
 
+import numpy as np
+
+import memory as memory_profile
+import stats
+import store
+
 
 DIR = os.path.dirname(__file__)
 OUTPUT_DIR = os.path.join(DIR, 'output')
+CACHE_FILE = os.path.join(OUTPUT_DIR, 'benchmark_cache')
+
+
+# Time per loop of the best repetition, and optionally of every repetition.
+TimeitResult = namedtuple('TimeitResult', 'loops repetitions time times',
+                          defaults=((),))
+
+
+# Input distribution and pick size of configurations and results without
+# them.
+DEFAULT_DISTRIBUTION = 'random'
+DEFAULT_PICK = 5
+
+
+# A timing, and optionally a memory.MemoryResult, of a single cell.
+BenchmarkResult = namedtuple(
+    'BenchmarkResult',
+    'function element_count result distribution pick memory',
+    defaults=(DEFAULT_DISTRIBUTION, DEFAULT_PICK, None)
+)
 
 
-TimeitResult = namedtuple('TimeitResult', 'loops repetitions time')
+# A single measurement of a sweep.
+Cell = namedtuple('Cell', 'function element_count distribution pick')
 
 
-BenchmarkResult = namedtuple('BenchmarkResult',
-                             'function element_count result')
+BenchmarkConfiguration = namedtuple(
+    'BenchmarkConfiguration',
+    'powers module_name prefix setup format_element format_call distributions '
+    'picks'
+)
 
 
-def timeit_command(function_setup, function_call):
-    """Build command suitable for the CLI of the timeit module."""
+# Number of repetitions for in-process timing, matching the timeit CLI.
+REPEAT = 5
+
+
+# Statistical mode: number of repetitions per measurement, relative
+# interquartile range above which a measurement is re-run, and the number of
+# re-runs.
+Sampling = namedtuple('Sampling', 'repeat noise reruns')
+STATS_REPEAT = 20
+RERUNS = 2
+
+
+def timeit_command(function_setup, function_call, repeat=None):
+    """Build command suitable for the CLI of the timeit module. With a number
+    of repetitions, timeit is run verbosely to also print every repetition.
+    """
     if function_setup is None:
         function_setup = []
     if function_call is None:
         raise ValueError('no function defined for the Timeit module to run')
 
+    options = [] if repeat is None else ['-v', '-v', '-r', str(repeat)]
     setup = [item for setup in function_setup for item in ['-s', setup]]
-    command = ['python3', '-m', 'timeit'] + setup + [function_call]
+    command = ['python3', '-m', 'timeit'] + options + setup + [function_call]
     return command
 
 
@@ -45,18 +96,69 @@ def timeit_output_to_float(time, time_unit):
     * "sec"     → s
     * "msec"    → ms
     * "usec"    → µs
+    * "nsec"    → ns
     """
-    exponent_translation = {'sec': '', 'msec': 'e-3', 'usec': 'e-6'}
+    exponent_translation = {
+        'sec': '', 'msec': 'e-3', 'usec': 'e-6', 'nsec': 'e-9'
+    }
     return float(time + exponent_translation[time_unit])
 
 
 def parse_timeit_output(output):
-    """Parse relevant information from timeit CLI output."""
-    r_loops, _, _, _, r_repetitions, r_time, r_time_unit, *_ = output.split()
+    """Parse relevant information from timeit CLI output, including the time
+    per loop of every repetition from the "raw times" of verbose output."""
+    lines = output.strip().splitlines()
+    r_loops, _, _, _, r_repetitions, r_time, r_time_unit, *_ = \
+        lines[-1].split()
     loops = int(r_loops)
     repetitions = int(r_repetitions.rstrip(':'))
     time = timeit_output_to_float(r_time, r_time_unit)
-    return TimeitResult(loops, repetitions, time)
+    times = ()
+    for line in lines:
+        if line.startswith('raw times:'):
+            r_times = line[len('raw times:'):].replace(',', ' ').split()
+            times = tuple(
+                timeit_output_to_float(r_total, r_unit) / loops
+                for r_total, r_unit in zip(r_times[::2], r_times[1::2])
+            )
+    return TimeitResult(loops, repetitions, time, times)
+
+
+def timeit_in_process(statement, namespace, repeat=REPEAT):
+    """Time a statement in the current process the way the timeit CLI does:
+    autorange the number of loops, then report the best of `repeat` runs.
+    """
+    timer = timeit.Timer(statement, globals=namespace)
+    loops, _ = timer.autorange()
+    times = tuple(total / loops for total in timer.repeat(repeat, loops))
+    return TimeitResult(loops, repeat, min(times), times)
+
+
+def measure(timer, sampling=None, label=None):
+    """Time a measurement with timer(), or in statistical mode with
+    timer(repeat=sampling.repeat).
+
+    In statistical mode, a measurement whose repetitions spread more than
+    sampling.noise is re-run up to sampling.reruns times, and the least noisy
+    result is returned. Measurements that stay noisy are logged as such.
+    """
+    if sampling is None:
+        return timer()
+    best = None
+    for attempt in range(1 + sampling.reruns):
+        if attempt:
+            logging.info('Re-running noisy {}.'.format(label))
+        result = timer(repeat=sampling.repeat)
+        spread = stats.relative_iqr(result.times)
+        if best is None or spread < best_spread:
+            best, best_spread = result, spread
+        if spread <= sampling.noise:
+            break
+    else:
+        logging.warning('Noisy {}: relative IQR {:.1%}'.format(
+            label, best_spread
+        ))
+    return best
 
 
 def get_function_names(module, prefix):
@@ -64,10 +166,12 @@ def get_function_names(module, prefix):
     return [fun for fun in dir(module) if fun.startswith(prefix)]
 
 
-def setup_element(format_element, element_count, max_element_count):
+def setup_element(format_element, element_count, max_element_count,
+                  distribution=DEFAULT_DISTRIBUTION):
     """Interpolate element specific setup string."""
     return format_element.format(
-        max_element_count=max_element_count, element_count=element_count
+        max_element_count=max_element_count, element_count=element_count,
+        distribution=distribution
     )
 
 
@@ -82,15 +186,53 @@ def filename_timestamp(timestamp=None):
 
 def parse_cli_arguments(args):
     """Define CLI and parse arguments accordingly."""
-    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser = argparse.ArgumentParser(
+        description=__doc__,
+        epilog='Run "%(prog)s compare BASE NEW" to compare two saved runs.'
+    )
 
     argparser.add_argument('config', help='configuration file')
     argparser.add_argument('--save', action='store_true',
                            help='save output to permanent storage')
+    argparser.add_argument('--in-process', action='store_true',
+                           help='time in the current interpreter instead of '
+                                'one timeit subprocess per measurement')
+    argparser.add_argument('--jobs', type=int, default=1, metavar='N',
+                           help='run measurements in N worker processes '
+                                'pinned to separate CPUs [default: 1]')
+    argparser.add_argument('--stats', action='store_true',
+                           help='record every repetition and re-run noisy '
+                                'measurements')
+    argparser.add_argument('--repeat', type=int, default=STATS_REPEAT,
+                           metavar='R',
+                           help='repetitions per measurement in statistical '
+                                'mode [default: {}]'.format(STATS_REPEAT))
+    argparser.add_argument('--noise', type=float,
+                           default=stats.NOISE_THRESHOLD, metavar='T',
+                           help='relative interquartile range above which a '
+                                'measurement is noisy [default: {}]'.format(
+                                    stats.NOISE_THRESHOLD))
+    argparser.add_argument('--reruns', type=int, default=RERUNS, metavar='K',
+                           help='re-runs of noisy measurements in '
+                                'statistical mode [default: {}]'.format(
+                                    RERUNS))
+    argparser.add_argument('--memory', action='store_true',
+                           help='also profile peak memory, resident set '
+                                'growth and allocated blocks of every cell')
+    argparser.add_argument('--cache', nargs='?', const=CACHE_FILE,
+                           metavar='FILE',
+                           help='reuse the timings of unchanged cells from, '
+                                'and add new timings to, a result cache '
+                                '[default: output/benchmark_cache]')
     argparser.add_argument('--debug', action='store_true',
                            help='enable debug output')
 
-    return argparser.parse_args(args)
+    args = argparser.parse_args(args)
+    if not 2 <= args.repeat <= store.MAX_TIMES:
+        argparser.error('--repeat must be between 2 and {}'.format(
+            store.MAX_TIMES
+        ))
+    return args
 
 
 def configure_logging(level):
@@ -113,8 +255,14 @@ def parse_benchmark_configuration(file):
         format_element: string sent to setup, with format interpolation for
             {element_count}: number of elements for a certain run.
             {element_count_max}: maximum number of elements during the run.
+            {distribution}: name of the input distribution for a certain run.
         format_call: string to be benchmarked, with format interpolation for
             {function}: name of the function being benchmarked.
+            {pick}: number of items to pick for a certain run.
+        distributions: optional whitespace separated names of input
+            distributions to sweep over [default: random].
+        pick: optional whitespace separated pick sizes to sweep over
+            [default: 5].
     """
     cparser = configparser.ConfigParser()
     cparser.read_file(file)
@@ -126,38 +274,483 @@ def parse_benchmark_configuration(file):
     setup = cget('setup').split('\n')
     format_element = cget('format_element')
     format_call = cget('format_call')
+    distributions = cget('distributions',
+                         fallback=DEFAULT_DISTRIBUTION).split()
+    picks = list(map(int, cget('pick', fallback=str(DEFAULT_PICK)).split()))
 
-    return powers, module_name, prefix, setup, format_element, format_call
+    return BenchmarkConfiguration(powers, module_name, prefix, setup,
+                                  format_element, format_call, distributions,
+                                  picks)
 
 
-def main(cli_args):
-    args = parse_cli_arguments(cli_args)
-    configure_logging('DEBUG' if args.debug else 'INFO')
-    with open(args.config) as file:
-        powers, module_name, prefix, setup, format_element, format_call = \
-            parse_benchmark_configuration(file)
+def sweep_cells(function_names, element_counts, distributions=None,
+                picks=None):
+    """List all cells of a sweep, grouped by distribution, pick and function.
+    Picks larger than the element count are left out.
+    """
+    if distributions is None:
+        distributions = [DEFAULT_DISTRIBUTION]
+    if picks is None:
+        picks = [DEFAULT_PICK]
+    return [
+        Cell(function, element_count, distribution, pick)
+        for distribution, pick, function, element_count in itertools.product(
+            distributions, picks, function_names, element_counts
+        )
+        if pick <= element_count
+    ]
 
-    element_counts = [int(10**power) for power in powers]
-    max_element_count = max(element_counts)
 
-    def benchmark(function, element_count):
-        element_setup = setup_element(
-            format_element, element_count, max_element_count
+def input_key(cell):
+    """Key of the input a cell is measured on."""
+    return cell.element_count, cell.distribution
+
+
+def cell_statements(format_element, format_call, cell, max_element_count):
+    """Return the element setup and the call to time for a cell."""
+    element_setup = setup_element(
+        format_element, cell.element_count, max_element_count,
+        cell.distribution
+    )
+    call = format_call.format(function=cell.function, pick=cell.pick)
+    return element_setup, call
+
+
+def sweep_fingerprint(config, max_element_count, in_process=False,
+                      sampling=None, memory=False):
+    """Describe what all measurements of a sweep depend on besides the cell
+    and the source of the function: interpreter, setup, input, runner,
+    statistical mode and memory profiling."""
+    return {
+        'python': [platform.python_implementation(),
+                   platform.python_version()],
+        'setup': config.setup,
+        'format_element': config.format_element,
+        'format_call': config.format_call,
+        'max_element_count': max_element_count,
+        'in_process': in_process,
+        'sampling': sampling,
+        'memory': memory,
+    }
+
+
+def function_sources(module, function_names):
+    """Map function name → source code of the function."""
+    return {
+        name: inspect.getsource(getattr(module, name))
+        for name in function_names
+    }
+
+
+def cell_key(cell, source, fingerprint):
+    """Cache key of a cell: a hash of the function source, the sweep
+    fingerprint, the distribution, the element count and the pick.
+
+    Only the source of the benchmarked function itself is hashed, so changes
+    to helpers it calls do not invalidate its cached timings.
+    """
+    payload = json.dumps([source, fingerprint, cell._asdict()],
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def split_cached(cells, keys, cache, on_result=None):
+    """Return the results of the cells with a cached timing, and the cells
+    left to measure. Cells cached as skipped are neither."""
+    cached = []
+    missing = []
+    for cell in cells:
+        entry = cache.get(keys[cell])
+        if entry is None:
+            missing.append(cell)
+            continue
+        timing, usage = entry
+        if timing is None:
+            skip_cell(cell, 'skipped by a cached run')
+            continue
+        if usage is not None:
+            usage = memory_profile.MemoryResult(*usage)
+        cached.append(
+            cell_result(cell, TimeitResult(*timing), on_result, usage)
         )
-        call = format_call.format(function=function)
+    return cached, missing
+
+
+def cache_skipped(cells, results, keys, cache):
+    """Cache the cells without a result as skipped, so that later runs only
+    retry them once their key changes."""
+    measured = {
+        Cell(result.function, result.element_count, result.distribution,
+             result.pick)
+        for result in results
+    }
+    for cell in cells:
+        if cell not in measured:
+            cache.put(keys[cell], None)
+
+
+def cell_result(cell, output, on_result=None, memory=None):
+    """Combine a cell, its timing and optionally its memory profile into a
+    logged BenchmarkResult, which is also passed to on_result if given."""
+    result = BenchmarkResult(
+        cell.function, cell.element_count, output, cell.distribution,
+        cell.pick, memory
+    )
+    logging.info(result)
+    if on_result is not None:
+        on_result(result)
+    return result
+
+
+def skip_cell(cell, error):
+    """Log a cell that could not be measured, e.g. a kernel that cannot
+    compare the items of a certain distribution."""
+    logging.warning('Skipping {}: {!r}'.format(cell, error))
+
+
+# Errors of a single measurement that should not abort the whole sweep.
+CELL_ERRORS = (subprocess.CalledProcessError, TypeError)
 
-        command = timeit_command(setup + [element_setup], call)
-        logging.debug("::".join(command))
 
-        r_output = subprocess.check_output(command, universal_newlines=True)
-        output = parse_timeit_output(r_output)
+def benchmark_subprocess(setup, element_setup, call, repeat=None):
+    """Benchmark a call in a timeit CLI subprocess."""
+    command = timeit_command(setup + [element_setup], call, repeat)
+    logging.debug("::".join(command))
 
-        result = BenchmarkResult(function, element_count, output)
-        logging.info(result)
-        return result
+    r_output = subprocess.check_output(command, universal_newlines=True)
+    return parse_timeit_output(r_output)
 
-    module = importlib.import_module(module_name)
-    function_names = get_function_names(module, prefix)
+
+def benchmark_serial(setup, format_element, format_call, cells,
+                     max_element_count, on_result=None, sampling=None,
+                     memory=False):
+    """Benchmark cells one by one in timeit CLI subprocesses, and with
+    `memory` profile them in another subprocess each."""
+    results = []
+    for cell in cells:
+        element_setup, call = cell_statements(
+            format_element, format_call, cell, max_element_count
+        )
+        try:
+            output = measure(
+                functools.partial(benchmark_subprocess, setup, element_setup,
+                                  call),
+                sampling, cell
+            )
+            usage = None
+            if memory:
+                usage = memory_profile.profile_subprocess(
+                    setup + [element_setup], call
+                )
+        except CELL_ERRORS as error:
+            skip_cell(cell, error)
+            continue
+        results.append(cell_result(cell, output, on_result, usage))
+    return results
+
+
+def benchmark_in_process(setup, format_element, format_call, cells,
+                         max_element_count, on_result=None, sampling=None,
+                         memory=False):
+    """Benchmark cells in the current process.
+
+    The setup is executed, and the input built, once per element count and
+    distribution and shared between all functions and picks, instead of once
+    per measurement as with the timeit CLI. Results are ordered like the
+    cells.
+    """
+    results = {}
+    inputs = itertools.groupby(sorted(cells, key=input_key), key=input_key)
+    for _, input_cells in inputs:
+        namespace = None
+        for cell in input_cells:
+            element_setup, call = cell_statements(
+                format_element, format_call, cell, max_element_count
+            )
+            if namespace is None:
+                namespace = {}
+                exec('\n'.join(setup + [element_setup]), namespace)
+            try:
+                output = measure(
+                    functools.partial(timeit_in_process, call, namespace),
+                    sampling, cell
+                )
+                usage = None
+                if memory:
+                    usage = memory_profile.profile_in_process(call, namespace)
+            except CELL_ERRORS as error:
+                skip_cell(cell, error)
+                continue
+            results[cell] = cell_result(cell, output, on_result, usage)
+
+    return [results[cell] for cell in cells if cell in results]
+
+
+def available_cpus():
+    """List the CPUs the current process is allowed to run on."""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def largest_first(cells):
+    """Order cells by descending element count, so that the slowest
+    measurements are not left for the end of a parallel run. Cells sharing an
+    input stay adjacent.
+    """
+    return sorted(cells, key=input_key, reverse=True)
+
+
+# Input namespace of the most recent element count in a worker process, reused
+# while consecutive cells share the element count.
+_worker_namespace = {}
+
+
+def _pin_worker(cpus):
+    """Process pool initializer pinning each worker to a CPU of its own."""
+    cpu = cpus.get()
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {cpu})
+
+
+def _benchmark_cell(setup, element_setup, call, in_process, sampling=None,
+                    label=None, memory=False):
+    """Measure a single cell in a worker process, returning its timing and
+    its memory profile or None."""
+    if not in_process:
+        timer = functools.partial(benchmark_subprocess, setup, element_setup,
+                                  call)
+        output = measure(timer, sampling, label)
+        usage = None
+        if memory:
+            usage = memory_profile.profile_subprocess(
+                setup + [element_setup], call
+            )
+        return output, usage
+    if element_setup not in _worker_namespace:
+        _worker_namespace.clear()
+        namespace = {}
+        exec('\n'.join(setup + [element_setup]), namespace)
+        _worker_namespace[element_setup] = namespace
+    namespace = _worker_namespace[element_setup]
+    output = measure(functools.partial(timeit_in_process, call, namespace),
+                     sampling, label)
+    usage = None
+    if memory:
+        usage = memory_profile.profile_in_process(call, namespace)
+    return output, usage
+
+
+def benchmark_parallel(jobs, setup, format_element, format_call, cells,
+                       max_element_count, in_process=False, on_result=None,
+                       sampling=None, memory=False):
+    """Benchmark all cells in `jobs` worker processes pinned to separate CPUs.
+
+    Cells are scheduled largest element count first, and results are ordered
+    like those of the serial runners. Timeit subprocesses inherit the CPU
+    affinity of the worker that starts them.
+    """
+    cpus = multiprocessing.Queue()
+    for _, cpu in zip(range(jobs), itertools.cycle(available_cpus())):
+        cpus.put(cpu)
+
+    results = {}
+    with concurrent.futures.ProcessPoolExecutor(
+            jobs, initializer=_pin_worker, initargs=(cpus,)) as executor:
+        futures = {}
+        for cell in largest_first(cells):
+            element_setup, call = cell_statements(
+                format_element, format_call, cell, max_element_count
+            )
+            future = executor.submit(
+                _benchmark_cell, setup, element_setup, call, in_process,
+                sampling, cell, memory
+            )
+            futures[future] = cell
+        for future in concurrent.futures.as_completed(futures):
+            cell = futures[future]
+            try:
+                output, usage = future.result()
+            except CELL_ERRORS as error:
+                skip_cell(cell, error)
+                continue
+            results[cell] = cell_result(cell, output, on_result, usage)
+
+    return [results[cell] for cell in cells if cell in results]
+
+
+# Relative slowdown beyond which the compare subcommand reports a regression.
+REGRESSION_THRESHOLD = 0.05
+
+
+# The timings of a cell in a base and a new run by the same statistic, the
+# median or the best time, and the ratio of the new to the base time with its
+# confidence interval, which is NaN without repeated timings in both runs.
+Comparison = namedtuple('Comparison',
+                        'cell statistic base new ratio ci_low ci_high')
+
+
+def parse_compare_arguments(args):
+    """Define CLI of the compare subcommand and parse arguments
+    accordingly."""
+    argparser = argparse.ArgumentParser(
+        prog='benchmark.py compare',
+        description='Compare two saved benchmark runs cell by cell.'
+    )
+    argparser.add_argument('base', help='results file of the baseline run',
+                           metavar='BASE')
+    argparser.add_argument('new', help='results file of the new run',
+                           metavar='NEW')
+    argparser.add_argument('--threshold', type=float,
+                           default=REGRESSION_THRESHOLD, metavar='T',
+                           help='relative slowdown counted as a regression '
+                                '[default: {}]'.format(REGRESSION_THRESHOLD))
+    argparser.add_argument('--markdown', metavar='FILE',
+                           help='also write the table as Markdown to FILE')
+    return argparser.parse_args(args)
+
+
+def record_cell(record):
+    """Cell of a result record."""
+    return Cell(str(record['function']), int(record['element_count']),
+                str(record['distribution']), int(record['pick']))
+
+
+def record_timing(record, statistic):
+    """Return the time of a result record by a statistic, 'median' or
+    'best', and its repetition times."""
+    times = record['times'][~np.isnan(record['times'])]
+    time = record['median'] if statistic == 'median' else record['time']
+    return float(time), times
+
+
+def common_statistic(*records):
+    """The statistic comparable between result records: the median if all
+    of them have one, and else the best time, which every record has."""
+    if any(np.isnan(record['median']) for record in records):
+        return 'best'
+    return 'median'
+
+
+def compare_records(base, new):
+    """Compare the result records of two runs for the cells present in both,
+    in the order of the base run."""
+    new_records = {record_cell(record): record for record in new}
+    comparisons = []
+    for record in base:
+        cell = record_cell(record)
+        if cell not in new_records:
+            continue
+        statistic = common_statistic(record, new_records[cell])
+        base_time, base_times = record_timing(record, statistic)
+        new_time, new_times = record_timing(new_records[cell], statistic)
+        ci = (float('nan'), float('nan'))
+        if len(base_times) > 1 and len(new_times) > 1:
+            ci = stats.bootstrap_ratio_ci(base_times, new_times)
+        comparisons.append(Comparison(cell, statistic, base_time, new_time,
+                                      new_time / base_time, *ci))
+    return comparisons
+
+
+def is_significant(comparison):
+    """Whether the confidence interval of the ratio excludes 1. Comparisons
+    without a confidence interval count as significant."""
+    if np.isnan(comparison.ci_low):
+        return True
+    return comparison.ci_low > 1 or comparison.ci_high < 1
+
+
+def is_regression(comparison, threshold=REGRESSION_THRESHOLD):
+    """Whether a comparison is a significant slowdown beyond a threshold."""
+    return comparison.ratio > 1 + threshold and is_significant(comparison)
+
+
+def comparison_rows(comparisons, threshold=REGRESSION_THRESHOLD):
+    """Format comparisons as table rows of strings, with a header row."""
+    rows = [('Function', 'Elements', 'Distribution', 'Pick', 'Statistic',
+             'Base', 'New', 'Change', 'CI', 'Verdict')]
+    for comparison in comparisons:
+        if np.isnan(comparison.ci_low):
+            ci = '-'
+        else:
+            ci = '{:+.1%} … {:+.1%}'.format(comparison.ci_low - 1,
+                                            comparison.ci_high - 1)
+        if is_regression(comparison, threshold):
+            verdict = 'REGRESSION'
+        elif not is_significant(comparison):
+            verdict = 'noise'
+        elif comparison.ratio < 1:
+            verdict = 'faster'
+        else:
+            verdict = 'slower'
+        rows.append((
+            *map(str, comparison.cell), comparison.statistic,
+            '{:.4g}'.format(comparison.base), '{:.4g}'.format(comparison.new),
+            '{:+.1%}'.format(comparison.ratio - 1), ci, verdict
+        ))
+    return rows
+
+
+def format_table(rows, markdown=False):
+    """Format table rows as aligned plain text, or as Markdown."""
+    widths = [max(map(len, column)) for column in zip(*rows)]
+    lines = []
+    for i, row in enumerate(rows):
+        cells = [cell.ljust(width) for cell, width in zip(row, widths)]
+        if markdown:
+            lines.append('| {} |'.format(' | '.join(cells)))
+            if i == 0:
+                lines.append('|{}|'.format(
+                    '|'.join('-' * (width + 2) for width in widths)
+                ))
+        else:
+            lines.append('  '.join(cells).rstrip())
+    return '\n'.join(lines) + '\n'
+
+
+def compare(cli_args):
+    """Compare two saved runs, print a table of the relative changes, and
+    return exit status 1 if any cell regressed beyond the threshold."""
+    args = parse_compare_arguments(cli_args)
+    runs = []
+    for path in args.base, args.new:
+        with open(path, 'rb') as f:
+            runs.append(store.load(f)[1])
+    comparisons = compare_records(*runs)
+    rows = comparison_rows(comparisons, args.threshold)
+    print(format_table(rows), end='')
+    if args.markdown is not None:
+        with open(args.markdown, 'w') as f:
+            f.write(format_table(rows, markdown=True))
+
+    regressed = sorted({
+        comparison.cell.function for comparison in comparisons
+        if is_regression(comparison, args.threshold)
+    })
+    if regressed:
+        print('Regressions beyond {:.1%}: {}'.format(
+            args.threshold, ', '.join(regressed)
+        ))
+        return 1
+    return 0
+
+
+def main(cli_args):
+    if cli_args[:1] == ['compare']:
+        sys.exit(compare(cli_args[1:]))
+    args = parse_cli_arguments(cli_args)
+    configure_logging('DEBUG' if args.debug else 'INFO')
+    with open(args.config) as file:
+        config = parse_benchmark_configuration(file)
+
+    element_counts = [int(10**power) for power in config.powers]
+    max_element_count = max(element_counts)
+
+    module = importlib.import_module(config.module_name)
+    function_names = get_function_names(module, config.prefix)
+    cells = sweep_cells(function_names, element_counts, config.distributions,
+                        config.picks)
 
     logging.info('STARTING BENCHMARK RUN')
     logging.info(
@@ -166,20 +759,79 @@ def main(cli_args):
     )
     logging.info('Functions:\n  {}'.format('\n  '.join(function_names)))
     logging.info('Element counts:\n  {}'.format(element_counts))
+    logging.info('Distributions:\n  {}'.format(config.distributions))
+    logging.info('Picks:\n  {}'.format(config.picks))
 
-    results = [
-        benchmark(function, element_count)
-        for function, element_count
-        in itertools.product(function_names, element_counts)
-    ]
+    sampling = None
+    if args.stats:
+        sampling = Sampling(args.repeat, args.noise, args.reruns)
+        logging.info('Statistical mode: {}'.format(sampling))
 
+    writer = None
     if args.save:
         filename = 'benchmark_output_{}'.format(filename_timestamp())
         output_file = os.path.join(OUTPUT_DIR, filename)
-        with open(output_file, 'wb') as f:
-            pickle.dump(results, f)
-
-        logging.info('Wrote benchmark results to "{}".'.format(output_file))
+        writer = store.ResultWriter(
+            output_file, store.run_metadata(config=config._asdict())
+        )
+        logging.info('Writing benchmark results to "{}".'.format(output_file))
+    on_result = writer.append if writer is not None else None
+
+    cache = None
+    cached = []
+    to_measure = cells
+    if args.cache is not None:
+        cache = store.ResultCache(args.cache)
+        sources = function_sources(module, function_names)
+        fingerprint = sweep_fingerprint(config, max_element_count,
+                                        args.in_process, sampling,
+                                        args.memory)
+        keys = {
+            cell: cell_key(cell, sources[cell.function], fingerprint)
+            for cell in cells
+        }
+        cached, to_measure = split_cached(cells, keys, cache, on_result)
+        logging.info('Reusing {} cached cells from "{}", measuring {}.'.format(
+            len(cached), args.cache, len(to_measure)
+        ))
+
+        def on_measured(result):
+            cell = Cell(result.function, result.element_count,
+                        result.distribution, result.pick)
+            cache.put(keys[cell], result.result, result.memory)
+            if writer is not None:
+                writer.append(result)
+
+        on_result = on_measured
+
+    sweep = config.setup, config.format_element, config.format_call, \
+        to_measure, max_element_count
+    try:
+        if args.jobs > 1:
+            measured = benchmark_parallel(args.jobs, *sweep, args.in_process,
+                                          on_result, sampling, args.memory)
+        elif args.in_process:
+            measured = benchmark_in_process(*sweep, on_result, sampling,
+                                            args.memory)
+        else:
+            measured = benchmark_serial(*sweep, on_result, sampling,
+                                        args.memory)
+        if cache is not None:
+            cache_skipped(to_measure, measured, keys, cache)
+    finally:
+        if cache is not None:
+            cache.close()
+        if writer is not None:
+            writer.close()
+            logging.info(
+                'Wrote benchmark results to "{}".'.format(output_file)
+            )
+
+    position = {cell: i for i, cell in enumerate(cells)}
+    return sorted(cached + measured, key=lambda result: position[
+        Cell(result.function, result.element_count, result.distribution,
+             result.pick)
+    ])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Calibrate the dispatch profile used by nlargest.nlargest from saved
+benchmark results."""
+import argparse
+import collections
+import configparser
+import statistics
+import sys
+
+from benchmark import DEFAULT_DISTRIBUTION, DEFAULT_PICK
+import nlargest
+import store
+
+
+SORT_FUNCTION = 'nlargest_ref_sorted'
+LIST_FUNCTION = 'nlargest_list3'
+HEAP_FUNCTION = 'nlargest_heapreplace3'
+SELECT_FUNCTION = 'nlargest_select'
+
+
+def parse_cli_arguments(args):
+    """Define CLI and parse arguments accordingly."""
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument('file', help='benchmark data file', metavar='FILE')
+    argparser.add_argument('--profile', metavar='FILE',
+                           default=nlargest.PROFILE_FILE,
+                           help='profile file to update '
+                                '[default: config/profile.ini]')
+    return argparser.parse_args(args)
+
+
+def timings(data, distribution=DEFAULT_DISTRIBUTION, pick=DEFAULT_PICK):
+    """Map function name → {element_count: time} for benchmark results of a
+    given input distribution and pick size."""
+    series = collections.defaultdict(dict)
+    for result in data:
+        if result.distribution == distribution and result.pick == pick:
+            series[result.function][result.element_count] = result.result.time
+    return series
+
+
+def crossover_element_count(slow, fast):
+    """Return the smallest element count from which the `fast` series is
+    faster than the `slow` series at every larger element count, or None if
+    `fast` never settles below `slow`.
+    """
+    element_counts = sorted(set(slow) & set(fast))
+    crossover = None
+    for element_count in reversed(element_counts):
+        if fast[element_count] >= slow[element_count]:
+            break
+        crossover = element_count
+    return crossover
+
+
+def calibrate(data, profile=nlargest.DEFAULT_PROFILE):
+    """Derive a dispatch profile from the benchmark results of all picks.
+
+    sort_ratio is the median over the picks of the pick divided by the element
+    count from which the fastest selection kernel beats a full sort.
+    list_max_pick is the largest pick below the smallest pick at which the
+    heap kernel beats the list kernel at the largest element count. Picks on
+    only one side of the crossover just move the existing value to agree.
+    select_min_count is the median over the picks of the element count from
+    which the selection kernel beats a full sort.
+    """
+    ratios = []
+    select_counts = []
+    list_wins = {}
+    for pick in sorted({result.pick for result in data}):
+        series = timings(data, pick=pick)
+        sort, linear, heap = (
+            series[name]
+            for name in (SORT_FUNCTION, LIST_FUNCTION, HEAP_FUNCTION)
+        )
+        element_counts = set(linear) & set(heap)
+        best = {
+            element_count: min(linear[element_count], heap[element_count])
+            for element_count in element_counts
+        }
+        crossover = crossover_element_count(sort, best)
+        if crossover is not None:
+            ratios.append(pick / crossover)
+        select_crossover = crossover_element_count(sort,
+                                                   series[SELECT_FUNCTION])
+        if select_crossover is not None:
+            select_counts.append(select_crossover)
+        if element_counts:
+            largest = max(element_counts)
+            list_wins[pick] = linear[largest] < heap[largest]
+
+    sort_ratio = statistics.median(ratios) if ratios else profile.sort_ratio
+
+    list_max_pick = profile.list_max_pick
+    first_loss = min((p for p, wins in list_wins.items() if not wins),
+                     default=None)
+    if first_loss is None:
+        if list_wins:
+            list_max_pick = max(list_max_pick, max(list_wins))
+    else:
+        below = [p for p in list_wins if p < first_loss]
+        list_max_pick = (max(below) if below
+                         else min(list_max_pick, first_loss - 1))
+
+    select_min_count = (int(statistics.median(select_counts))
+                        if select_counts else profile.select_min_count)
+
+    return nlargest.Profile(sort_ratio=sort_ratio, list_max_pick=list_max_pick,
+                            select_min_count=select_min_count)
+
+
+def write_profile(profile, file):
+    """Write a dispatch profile as INI-style section "Dispatch"."""
+    cparser = configparser.ConfigParser()
+    cparser['Dispatch'] = {
+        field: str(value) for field, value in profile._asdict().items()
+    }
+    cparser.write(file)
+
+
+def main(cli_args):
+    args = parse_cli_arguments(cli_args)
+
+    with open(args.file, 'br') as f:
+        _, records = store.load(f)
+    data = store.to_benchmark_results(records)
+
+    profile = calibrate(data, nlargest.load_profile(args.profile))
+    with open(args.profile, 'w') as f:
+        write_profile(profile, f)
+
+    print('Wrote {} → {}'.format(profile, args.profile))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
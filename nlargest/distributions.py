@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Named input distributions for benchmarking, all drawn from the global
+`random` state so that a fixed seed reproduces the same input."""
+import random as _random
+
+
+# Fraction of positions swapped in nearly sorted input.
+SWAP_FRACTION = 0.01
+
+# Shape parameter of the Pareto distribution behind the Zipfian input.
+ZIPF_ALPHA = 1.2
+
+# Number of distinct values in input with many duplicates.
+DUPLICATE_VALUES = 10
+
+
+def random(element_count, max_element_count):
+    """Uniformly distributed integers below max_element_count."""
+    return [_random.randrange(max_element_count) for _ in range(element_count)]
+
+
+def ascending(element_count, max_element_count):
+    """Random integers in ascending order, the worst case for the threshold
+    test as every item replaces the smallest retained one."""
+    return sorted(random(element_count, max_element_count))
+
+
+def descending(element_count, max_element_count):
+    """Random integers in descending order."""
+    return sorted(random(element_count, max_element_count), reverse=True)
+
+
+def nearly_sorted(element_count, max_element_count):
+    """Ascending input with a small fraction of randomly swapped items."""
+    items = ascending(element_count, max_element_count)
+    for _ in range(int(element_count * SWAP_FRACTION)):
+        i = _random.randrange(element_count)
+        j = _random.randrange(element_count)
+        items[i], items[j] = items[j], items[i]
+    return items
+
+
+def duplicates(element_count, max_element_count):
+    """Integers drawn from only a few distinct values."""
+    return [_random.randrange(DUPLICATE_VALUES) for _ in range(element_count)]
+
+
+def zipf(element_count, max_element_count):
+    """Heavy-tailed integers with a Zipf-like distribution."""
+    return [
+        min(int(_random.paretovariate(ZIPF_ALPHA)), max_element_count)
+        for _ in range(element_count)
+    ]
+
+
+def strings(element_count, max_element_count):
+    """Random integers as hexadecimal strings, compared lexically."""
+    return ['{:x}'.format(i) for i in random(element_count, max_element_count)]
+
+
+def tuples(element_count, max_element_count):
+    """Pairs of random integers, compared lexicographically."""
+    return list(zip(random(element_count, max_element_count),
+                    random(element_count, max_element_count)))
+
+
+NAMES = [
+    'random', 'ascending', 'descending', 'nearly_sorted', 'duplicates',
+    'zipf', 'strings', 'tuples',
+]
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Find the n largest items in file system and file based sources without
+materialising them in memory."""
+import itertools
+import math
+import mmap
+import operator
+import os
+import struct
+
+import nlargest
+
+
+# Default number of bytes mapped at a time by nlargest_mmap, rounded to whole
+# allocation granules and items.
+WINDOW_SIZE = 1 << 24
+
+
+# Sort keys for directory entries, and whether they need a stat() call.
+ENTRY_KEYS = {
+    'name': (operator.attrgetter('name'), False),
+    'path': (operator.attrgetter('path'), False),
+    'mtime': (lambda entry: entry.stat().st_mtime, True),
+    'size': (lambda entry: entry.stat().st_size, True),
+}
+
+
+def scandir_files(path, recursive=False, stat=False):
+    """Yield os.DirEntry objects for the files in a directory, optionally
+    descending into subdirectories. With stat=True the stat result is fetched
+    (and cached on the entry) up front, skipping files removed in between.
+    Like os.walk, subdirectories that cannot be scanned are skipped.
+    """
+    with os.scandir(path) as iterator:
+        for entry in iterator:
+            try:
+                if entry.is_file():
+                    if stat:
+                        entry.stat()
+                    yield entry
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    yield from scandir_files(entry.path, recursive, stat)
+            except OSError:
+                continue
+
+
+def nlargest_dir(n, path, key='name', recursive=False):
+    """Return os.DirEntry objects for the n largest files in a directory in
+    ascending order by key, which is one of 'name', 'path', 'mtime' and
+    'size'.
+
+    Entries are streamed from os.scandir into a keyed selection kernel, so
+    the listing is never held in memory and stat() is only called for keys
+    based on it.
+    """
+    key_function, stat = ENTRY_KEYS[key]
+    entries = scandir_files(path, recursive, stat)
+    return nlargest.nlargest(n, entries, key=key_function)
+
+
+def _windows(file_size, itemsize, window_size):
+    """Yield (offset, length) for page-aligned windows over whole items."""
+    step = itemsize * mmap.ALLOCATIONGRANULARITY // math.gcd(
+        itemsize, mmap.ALLOCATIONGRANULARITY
+    )
+    window_size = max(step, window_size - window_size % step)
+    file_size -= file_size % itemsize
+    for offset in range(0, file_size, window_size):
+        yield offset, min(window_size, file_size - offset)
+
+
+def nlargest_mmap(n, path, fmt='<q', window_size=WINDOW_SIZE):
+    """Return the n largest values in a binary file of packed numbers as
+    (value, byte offset) pairs in ascending order.
+
+    fmt is a single-item struct format such as '<q' (little-endian int64) or
+    '<f' (little-endian float32). The file is memory-mapped one window of
+    about window_size bytes at a time, so that resident memory stays bounded
+    regardless of the file size. A trailing partial item is ignored. Of
+    equal values, the ones at the lowest offsets are kept.
+    """
+    if n <= 0:
+        return []
+    itemsize = struct.calcsize(fmt)
+    with open(path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        windows = _windows(file_size, itemsize, window_size)
+        dtype = None if nlargest.numpy is None else _numpy_dtype(fmt)
+        if dtype is None:
+            return _nlargest_mmap_struct(n, f, fmt, itemsize, windows)
+        return _nlargest_mmap_numpy(n, f, dtype, itemsize, windows)
+
+
+def _numpy_dtype(fmt):
+    """Return the NumPy dtype of a single-item struct format, or None if
+    NumPy does not accept it."""
+    # NumPy spells struct's network order '!' as '>' and native '@' as '='.
+    fmt = fmt.replace('!', '>').replace('@', '=')
+    try:
+        return nlargest.numpy.dtype(fmt)
+    except TypeError:
+        return None
+
+
+# Both paths select (value, -offset) pairs, so that of equal values the later
+# ones compare smaller and are evicted first, and negate the offsets back at
+# the end.
+
+def _undecorate(largest):
+    return sorted((value, -offset) for value, offset in largest)
+
+
+def _nlargest_mmap_numpy(n, f, dtype, itemsize, windows):
+    """Vectorised selection: every window is masked against the running
+    threshold by nlargest.nlargest_chunked's array path, keeping byte
+    offsets."""
+    numpy = nlargest.numpy
+    largest = []
+    for offset, length in windows:
+        with mmap.mmap(f.fileno(), length, offset=offset,
+                       access=mmap.ACCESS_READ) as window:
+            chunk = numpy.frombuffer(window, dtype=dtype)
+            nlargest._push_chunked_array(largest, n, chunk,
+                                         nlargest.CHUNK_SIZE, -offset,
+                                         -itemsize)
+            del chunk
+    return _undecorate(largest)
+
+
+def _nlargest_mmap_struct(n, f, fmt, itemsize, windows):
+    """Fallback without NumPy, unpacking every item with struct."""
+    top = nlargest.TopN(n)
+    for offset, length in windows:
+        with mmap.mmap(f.fileno(), length, offset=offset,
+                       access=mmap.ACCESS_READ) as window:
+            values = (value for value, in struct.iter_unpack(fmt, window))
+            top.extend(zip(values, itertools.count(-offset, -itemsize)))
+            del values
+    return _undecorate(top.result())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Approximate heavy hitters: the n most frequent items of a stream in
+bounded memory.
+
+SpaceSaving monitors at most `capacity` items with a counter each. An item
+that is not monitored takes over the counter of the least frequent monitored
+item, inheriting its count as the error of its own. Every counter thus
+overestimates the frequency of its item by at most its error, which is at most
+N/capacity for a stream of N items, and any item more frequent than that is
+monitored. Memory is bounded by the capacity regardless of the number of
+distinct items.
+
+The counters are kept in a dict, with a min-heap of (count, order, item)
+entries to find the least frequent item. Entries are not updated when counts
+grow but refreshed lazily when they reach the root, so that a monitored item
+costs a single dict update. Items are counted in chunks by
+collections.Counter first, so that repeats within a chunk cost no
+interpreter time, and every distinct item of a chunk is added with its weight.
+
+The n most frequent monitored items are finally selected by
+nlargest.nlargest_heapreplace3, and can be made exact by a second pass over
+the stream counting only those candidates (see exact_top).
+"""
+import collections
+import heapq
+import itertools
+import operator
+
+import nlargest
+
+
+# Default number of items counted per chunk by SpaceSaving.update.
+CHUNK_SIZE = 65536
+
+
+# A monitored item, its estimated frequency and the maximum overestimation of
+# that frequency, so that the true frequency lies in [count - error, count].
+HeavyHitter = collections.namedtuple('HeavyHitter', 'item count error')
+
+
+class SpaceSaving:
+    """Space-Saving summary of the frequencies of the items of a stream."""
+
+    def __init__(self, capacity, iterable=(), chunk_size=CHUNK_SIZE):
+        if capacity < 1:
+            raise ValueError('capacity must be positive')
+        self.capacity = capacity
+        self.chunk_size = chunk_size
+        self.total = 0
+        self._counts = {}
+        self._errors = {}
+        self._heap = []
+        self._order = itertools.count()
+        self.update(iterable)
+
+    def __repr__(self):
+        return '{}({}, total={})'.format(type(self).__name__, self.capacity,
+                                         self.total)
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, item):
+        return item in self._counts
+
+    @property
+    def max_error(self):
+        """Upper bound of the frequency of any item that is not monitored,
+        and of the error of any counter: the smallest count once all counters
+        are in use, which is at most total / capacity."""
+        if len(self._counts) < self.capacity:
+            return 0
+        return min(self._counts.values())
+
+    def add(self, item, weight=1):
+        """Count an item, weight times."""
+        self.total += weight
+        self._add(item, weight)
+
+    def _add(self, item, weight):
+        counts = self._counts
+        if item in counts:
+            counts[item] += weight
+            return
+        heap = self._heap
+        if len(counts) < self.capacity:
+            counts[item] = weight
+            self._errors[item] = 0
+            heapq.heappush(heap, (weight, next(self._order), item))
+            return
+        # Refresh stale root entries until the root is the least frequent
+        # monitored item, then hand its counter over.
+        while True:
+            count, _, victim = heap[0]
+            current = counts[victim]
+            if current == count:
+                break
+            heapq.heapreplace(heap, (current, next(self._order), victim))
+        del counts[victim], self._errors[victim]
+        counts[item] = count + weight
+        self._errors[item] = count
+        heapq.heapreplace(heap, (count + weight, next(self._order), item))
+
+    def update(self, iterable):
+        """Count all items from an iterable, in chunks of chunk_size."""
+        iterator = iter(iterable)
+        while True:
+            chunk = collections.Counter(
+                itertools.islice(iterator, self.chunk_size)
+            )
+            if not chunk:
+                return
+            self.total += sum(chunk.values())
+            for item, weight in chunk.items():
+                self._add(item, weight)
+
+    def estimate(self, item):
+        """Return a HeavyHitter with the estimated frequency of an item. For
+        items that are not monitored, the count is an upper bound and the
+        error equals it."""
+        if item in self._counts:
+            return HeavyHitter(item, self._counts[item], self._errors[item])
+        return HeavyHitter(item, self.max_error, self.max_error)
+
+    def hitters(self):
+        """Return a HeavyHitter for every monitored item."""
+        return [HeavyHitter(item, count, self._errors[item])
+                for item, count in self._counts.items()]
+
+    def top(self, n):
+        """Return the n monitored items of the largest estimated frequency,
+        as HeavyHitter tuples in ascending order of count."""
+        if n <= 0:
+            return []
+        hitters = self.hitters()
+        if n >= len(hitters):
+            return sorted(hitters, key=operator.attrgetter('count'))
+        return nlargest.nlargest_heapreplace3(
+            n, hitters, key=operator.attrgetter('count')
+        )
+
+    def is_exact(self, n):
+        """Whether the items of top(n) are guaranteed to be the n most
+        frequent items: the frequency of each of them is at least its count
+        less its error, which has to exceed the largest possible frequency of
+        any other item."""
+        top = self.top(n + 1)
+        bound = self.max_error
+        if len(top) > n:
+            bound = max(bound, top[0].count)
+            top = top[1:]
+        return all(hitter.count - hitter.error > bound for hitter in top)
+
+
+def heavy_hitters(n, iterable, capacity=None, chunk_size=CHUNK_SIZE):
+    """Return the n most frequent items of an iterable as HeavyHitter
+    tuples in ascending order of estimated count, monitoring `capacity`
+    items, by default 10·n."""
+    if capacity is None:
+        capacity = 10 * max(n, 1)
+    return SpaceSaving(capacity, iterable, chunk_size).top(n)
+
+
+def exact_top(n, candidates, iterable):
+    """Return the exact frequencies of the n most frequent of the candidate
+    items, e.g. the monitored items of a SpaceSaving summary, as
+    (item, count) pairs in ascending order of count, counted by a second
+    pass over the stream. Memory is bounded by the number of candidates.
+    """
+    counts = dict.fromkeys(candidates, 0)
+    iterator = iter(iterable)
+    while True:
+        chunk = collections.Counter(itertools.islice(iterator, CHUNK_SIZE))
+        if not chunk:
+            break
+        for item, weight in chunk.items():
+            if item in counts:
+                counts[item] += weight
+    n = min(n, len(counts))
+    if n <= 0:
+        return []
+    return nlargest.nlargest_heapreplace3(n, counts.items(),
+                                          key=operator.itemgetter(1))
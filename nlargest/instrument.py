@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Instrumented counterparts of the selection kernels in nlargest.py.
+
+The kernels themselves are left untouched. Their instrumented counterparts
+follow the same algorithms in pure Python, with the heap sifts of the heapq
+module spelled out, and count the operations of every call:
+
+* items: items consumed from the input.
+* comparisons: comparisons of items or keys, including the threshold tests
+  and the comparisons when (re)building the heap or scanning the list for its
+  minimum, but not those of the final sort of the n largest items.
+* rejections: items that do not beat the current threshold.
+* replacements: items that replace the smallest retained item.
+* sift_depth: total number of levels replacing items sift down the heap,
+  and max_sift_depth its maximum for a single item.
+* calls: calls made by the selection loop into heapq or min(), including
+  the call the heappushpop kernels make for every item.
+
+Kernels initialised with the first n items ("2" and "3" variants) perform the
+same operations, so that a difference in time between them is interpreter
+overhead, such as that of itertools.islice, rather than extra work.
+"""
+import functools
+import itertools
+
+import nlargest
+
+
+class KernelStats:
+    """Operation counts of one or more calls of an instrumented kernel."""
+    __slots__ = ('calls', 'items', 'comparisons', 'rejections',
+                 'replacements', 'sift_depth', 'max_sift_depth')
+
+    def __init__(self):
+        for field in self.__slots__:
+            setattr(self, field, 0)
+
+    def add(self, other):
+        """Accumulate the counts of another KernelStats object."""
+        for field in self.__slots__:
+            if field == 'max_sift_depth':
+                self.max_sift_depth = max(self.max_sift_depth,
+                                          other.max_sift_depth)
+            else:
+                setattr(self, field, getattr(self, field)
+                        + getattr(other, field))
+        return self
+
+    @property
+    def rejection_rate(self):
+        """Fraction of the items tested against the threshold that were
+        rejected."""
+        tested = self.rejections + self.replacements
+        return self.rejections / tested if tested else 0.0
+
+    @property
+    def mean_sift_depth(self):
+        """Mean number of levels a replacing item sifts down the heap."""
+        if not self.replacements:
+            return 0.0
+        return self.sift_depth / self.replacements
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join(
+            '{}={}'.format(field, value)
+            for field, value in self.as_dict().items()
+        ))
+
+
+# Heap operations of the heapq module, counting comparisons.
+
+def _siftdown(heap, startpos, pos, stats):
+    """heapq._siftdown: move the item at pos up towards startpos."""
+    newitem = heap[pos]
+    while pos > startpos:
+        parentpos = (pos - 1) >> 1
+        parent = heap[parentpos]
+        stats.comparisons += 1
+        if newitem < parent:
+            heap[pos] = parent
+            pos = parentpos
+            continue
+        break
+    heap[pos] = newitem
+    return pos
+
+
+def _siftup(heap, pos, stats):
+    """heapq._siftup: move the item at pos down to a leaf, then back up to its
+    place. Return its final position."""
+    endpos = len(heap)
+    startpos = pos
+    newitem = heap[pos]
+    childpos = 2 * pos + 1
+    while childpos < endpos:
+        rightpos = childpos + 1
+        if rightpos < endpos:
+            stats.comparisons += 1
+            if not heap[childpos] < heap[rightpos]:
+                childpos = rightpos
+        heap[pos] = heap[childpos]
+        pos = childpos
+        childpos = 2 * pos + 1
+    heap[pos] = newitem
+    return _siftdown(heap, startpos, pos, stats)
+
+
+def _heapify(heap, stats):
+    """heapq.heapify."""
+    for i in reversed(range(len(heap) // 2)):
+        _siftup(heap, i, stats)
+
+
+def _replace_root(heap, entry, stats):
+    """heapq.heapreplace, also counting the replacement and its depth."""
+    heap[0] = entry
+    depth = (_siftup(heap, 0, stats) + 1).bit_length() - 1
+    stats.replacements += 1
+    stats.sift_depth += depth
+    stats.max_sift_depth = max(stats.max_sift_depth, depth)
+
+
+def _min_index(largest, stats):
+    """Index of the smallest item, like the min() scan of the list
+    kernels."""
+    stats.comparisons += max(len(largest) - 1, 0)
+    return min(range(len(largest)), key=largest.__getitem__)
+
+
+def _initial(n, iterator, key, order, head, stats):
+    """Return the initial n items: sentinels for the "1" variants, and the
+    first n items of the input for the "2" and "3" variants."""
+    if not head:
+        if key is None:
+            return n * [float('-inf')]
+        return nlargest._sentinels(n)
+    items = list(itertools.islice(iterator, n))
+    stats.items += len(items)
+    if key is None:
+        return items
+    return nlargest._decorate(items, key, order)
+
+
+def _finish(largest, key):
+    """Sort the n largest items like the kernels do."""
+    if key is None:
+        largest.sort()
+        return largest
+    return nlargest._undecorate(largest)
+
+
+def count_list(n, iterable, stats, key=None, head=False):
+    """Instrumented nlargest_list, nlargest_list2 and nlargest_list3."""
+    iterator = iter(iterable)
+    order = nlargest._tiebreak()
+    largest = _initial(n, iterator, key, order, head, stats)
+    min_index = _min_index(largest, stats) if head else 0
+    threshold = largest[min_index] if key is None else largest[min_index][0]
+    for i in iterator:
+        stats.items += 1
+        k = i if key is None else key(i)
+        stats.comparisons += 1
+        if k > threshold:
+            largest[min_index] = i if key is None else (k, next(order), i)
+            stats.replacements += 1
+            stats.calls += 1
+            min_index = _min_index(largest, stats)
+            threshold = (largest[min_index] if key is None
+                         else largest[min_index][0])
+        else:
+            stats.rejections += 1
+    return _finish(largest, key)
+
+
+def count_heap(n, iterable, stats, key=None, head=False, pushpop=False):
+    """Instrumented heapreplace, manual_heapreplace and, with pushpop,
+    heappushpop kernels, which all perform the same comparisons. The
+    heappushpop kernels call into heapq for every item instead of only for
+    those beating the threshold.
+    """
+    if pushpop and key is not None:
+        raise TypeError('the heappushpop kernels take no key')
+    iterator = iter(iterable)
+    order = nlargest._tiebreak()
+    largest = _initial(n, iterator, key, order, head, stats)
+    if head:
+        _heapify(largest, stats)
+    for i in iterator:
+        stats.items += 1
+        k = i if key is None else key(i)
+        if pushpop:
+            stats.calls += 1
+        stats.comparisons += 1
+        if k > (largest[0] if key is None else largest[0][0]):
+            if not pushpop:
+                stats.calls += 1
+            _replace_root(largest, i if key is None else (k, next(order), i),
+                          stats)
+        else:
+            stats.rejections += 1
+    return _finish(largest, key)
+
+
+# Kernel name → instrumented counterpart, taking (n, iterable, stats, key).
+KERNELS = {
+    'nlargest_list': count_list,
+    'nlargest_list2': functools.partial(count_list, head=True),
+    'nlargest_list3': functools.partial(count_list, head=True),
+    'nlargest_heapreplace': count_heap,
+    'nlargest_heapreplace2': functools.partial(count_heap, head=True),
+    'nlargest_heapreplace3': functools.partial(count_heap, head=True),
+    'nlargest_manual_heapreplace': count_heap,
+    'nlargest_manual_heapreplace2': functools.partial(count_heap, head=True),
+    'nlargest_manual_heapreplace3': functools.partial(count_heap, head=True),
+    'nlargest_heappushpop': functools.partial(count_heap, pushpop=True),
+    'nlargest_heappushpop2': functools.partial(count_heap, head=True,
+                                               pushpop=True),
+    'nlargest_heappushpop3': functools.partial(count_heap, head=True,
+                                               pushpop=True),
+}
+
+
+def instrument(kernel, stats=None, callback=None):
+    """Return an instrumented counterpart of a kernel, given as a function of
+    nlargest.py or its name, with the same results and signature.
+
+    The operation counts of every call are added to `stats`, a KernelStats
+    object, and passed as a KernelStats object of their own to `callback`.
+    """
+    name = kernel if isinstance(kernel, str) else kernel.__name__
+    try:
+        count = KERNELS[name]
+    except KeyError:
+        raise ValueError('no instrumented counterpart of {}'.format(name))
+
+    def instrumented(n, iterable, key=None):
+        call_stats = KernelStats()
+        result = count(n, iterable, call_stats, key=key)
+        if stats is not None:
+            stats.add(call_stats)
+        if callback is not None:
+            callback(call_stats)
+        return result
+
+    instrumented.__name__ = name
+    instrumented.__doc__ = 'Instrumented {}.'.format(name)
+    return instrumented
+
+
+def count_operations(n, items, kernels=KERNELS):
+    """Map kernel name → KernelStats of selecting the n largest of a sequence
+    of items, e.g. a sample of real data, with every given kernel."""
+    operations = {}
+    for name in kernels:
+        stats = KernelStats()
+        instrument(name, stats)(n, items)
+        operations[name] = stats
+    return operations
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Profile the memory use of a single call, alongside its timing."""
+import gc
+import json
+import subprocess
+import sys
+import tracemalloc
+from collections import namedtuple
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Peak bytes traced by tracemalloc during a call, growth in bytes of the
+# maximum resident set size of the process, and memory blocks allocated by
+# the call that are still alive when it returns, such as those of its result.
+MemoryResult = namedtuple('MemoryResult', 'peak rss blocks')
+
+
+def max_rss():
+    """Return the maximum resident set size of the process in bytes, or 0
+    where it is not available."""
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def profile_in_process(statement, namespace):
+    """Run a statement once in a namespace and profile its memory use.
+
+    The maximum resident set size only grows once the process exceeds its
+    earlier high-water mark, so its growth is most telling in a fresh process
+    as used by profile_subprocess.
+    """
+    try:
+        code = compile(statement, '<memory>', 'eval')
+    except SyntaxError:
+        code = compile(statement, '<memory>', 'exec')
+    gc.collect()
+    rss_before = max_rss()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        result = eval(code, namespace)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - blocks_before
+    rss = max_rss() - rss_before
+    del result
+    return MemoryResult(peak, rss, blocks)
+
+
+def profile_command(setup, statement):
+    """Build a command profiling a statement after setup statements in a new
+    interpreter, printing the MemoryResult as JSON."""
+    script = '\n'.join([
+        'import json, memory',
+        'namespace = {}',
+        'exec({!r}, namespace)'.format('\n'.join(setup)),
+        'print(json.dumps(memory.profile_in_process({!r}, namespace)))'.format(
+            statement
+        ),
+    ])
+    return ['python3', '-c', script]
+
+
+def profile_subprocess(setup, statement):
+    """Profile the memory use of a statement in a new interpreter."""
+    output = subprocess.check_output(profile_command(setup, statement),
+                                     universal_newlines=True)
+    return MemoryResult(*json.loads(output))
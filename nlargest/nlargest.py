@@ -1,20 +1,115 @@
 #!/usr/bin/env python3
+import concurrent.futures
+import configparser
 import functools
 import heapq
 import itertools
+import math
+import os
+import random
+from collections import namedtuple
+from multiprocessing import shared_memory
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-def nlargest_ref_sorted(n, iterable):
+
+DIR = os.path.dirname(__file__)
+PROFILE_FILE = os.path.join(DIR, 'config', 'profile.ini')
+
+
+# Element count from which large picks are selected by nlargest_select rather
+# than by a full sort, used when a profile does not set select_min_count.
+SELECT_MIN_COUNT = 5000
+
+
+Profile = namedtuple('Profile', 'sort_ratio list_max_pick select_min_count',
+                     defaults=(SELECT_MIN_COUNT,))
+
+
+# Default number of items compared against the threshold per batch by
+# nlargest_chunked.
+CHUNK_SIZE = 4096
+
+
+# Smallest number of items per shard for which parallel_nlargest starts a
+# worker process, below which starting it costs more than the selection.
+SHARD_MIN_SIZE = 100000
+
+
+# Inputs of at most this many items are sorted outright by nlargest_select.
+SELECT_CUTOFF = 64
+
+
+# Fallback thresholds used when no profile file is available.
+DEFAULT_PROFILE = Profile(sort_ratio=0.1, list_max_pick=8)
+
+
+# All kernels accept an optional `key` function. Keyed selection keeps
+# (key, order, item) tuples in the structure, where the insertion order breaks
+# ties so that items themselves are never compared. The order decreases, so
+# that of items with equal keys the later ones compare smaller and are evicted
+# first: like heapq.nlargest, every kernel keeps the earliest of tied items,
+# and returns them in the reverse of heapq.nlargest's order. The key is
+# computed once per item, and the tuple is only built for items that beat the
+# current threshold, which for small n is a small fraction of the input.
+
+@functools.total_ordering
+class _Bottom:
+    """Placeholder key comparing smaller than any other key, for keyed kernels
+    whose unkeyed counterparts are initialised with float('-inf')."""
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return self is other
+
+    def __lt__(self, other):
+        return self is not other
+
+    def __hash__(self):
+        return 0
+
+
+_BOTTOM = _Bottom()
+
+
+def _tiebreak():
+    """Decreasing insertion order of decorated items."""
+    return itertools.count(0, -1)
+
+
+def _sentinels(n):
+    """Decorated placeholders for keyed kernels initialised with -inf."""
+    return [(_BOTTOM, order, None) for order in range(-n, 0)]
+
+
+def _decorate(items, key, order):
+    """Decorate items as (key, order, item) tuples."""
+    return [(key(i), next(order), i) for i in items]
+
+
+def _undecorate(largest):
+    """Sort decorated tuples and strip the decoration, dropping sentinels."""
+    largest.sort()
+    return [i for k, order, i in largest if k is not _BOTTOM]
+
+
+def nlargest_ref_sorted(n, iterable, key=None):
     """Full list sorting for reference."""
+    if key is not None:
+        # Stable descending sort, keeping the earliest of tied items.
+        return sorted(iterable, key=key, reverse=True)[:n][::-1]
     return sorted(iterable)[-n:]
 
 
-def nlargest_ref_heapq(n, iterable):
+def nlargest_ref_heapq(n, iterable, key=None):
     """Vanilla implementation from the heapq module."""
-    return heapq.nlargest(n, iterable)[::-1]
+    return heapq.nlargest(n, iterable, key=key)[::-1]
 
 
-def nlargest_list(n, iterable):
+def nlargest_list(n, iterable, key=None):
     """Return the n largest items in the given iterable. O(N) performance for
     small n, where N is the length of the list.
     """
@@ -22,6 +117,17 @@ def nlargest_list(n, iterable):
     # every time and keeping track of the smallest item and its index in the
     # list for future replacement.
     get_min_index_value = functools.partial(min, key=lambda x: x[1])
+    if key is not None:
+        largest = _sentinels(n)
+        order = _tiebreak()
+        min_index, threshold = 0, largest[0][0]
+        for i in iterable:
+            k = key(i)
+            if k > threshold:
+                largest[min_index] = k, next(order), i
+                min_index, min_value = get_min_index_value(enumerate(largest))
+                threshold = min_value[0]
+        return _undecorate(largest)
     largest = n * [float('-inf')]
     min_index, min_value = 0, largest[0]
     for i in iterable:
@@ -32,7 +138,8 @@ def nlargest_list(n, iterable):
     return largest
 
 
-def nlargest_heapreplace(n, iterable):
+def nlargest_heapreplace(n, iterable, key=None, unique=False,
+                         unique_key=None):
     """Return the n largest items in the given iterable. O(N) performance for
     small n, where N is the length of the list.
     """
@@ -42,6 +149,19 @@ def nlargest_heapreplace(n, iterable):
     # be a O(log n) operation rather than O(n) for an exhaustive search, with
     # the drawback of having to do more internal list element movements when
     # the new item is sifted into the structure.
+    if unique or unique_key is not None:
+        return _nlargest_unique(n, iterable, key, unique_key)
+    if key is not None:
+        largest = _sentinels(n)
+        push_larger = functools.partial(heapq.heapreplace, largest)
+        order = _tiebreak()
+        threshold = largest[0][0]
+        for i in iterable:
+            k = key(i)
+            if k > threshold:
+                push_larger((k, next(order), i))
+                threshold = largest[0][0]
+        return _undecorate(largest)
     largest = n * [float('-inf')]
     push_larger = functools.partial(heapq.heapreplace, largest)
     for i in iterable:
@@ -68,7 +188,8 @@ def nlargest_heappushpop(n, iterable):
     return largest
 
 
-def nlargest_manual_heapreplace(n, iterable):
+def nlargest_manual_heapreplace(n, iterable, key=None, unique=False,
+                                unique_key=None):
     """Return the n largest items in the given iterable. O(N) performance for
     small n, where N is the length of the list.
     """
@@ -76,6 +197,20 @@ def nlargest_manual_heapreplace(n, iterable):
     # heapq._siftup function. The idea is that this should avoid some extra
     # tests performed by heapq.heapreplace, but in practice the same tests are
     # performed by heapq._siftup, so there is generally no speedup.
+    if unique or unique_key is not None:
+        return _nlargest_unique(n, iterable, key, unique_key)
+    if key is not None:
+        largest = _sentinels(n)
+        siftup = functools.partial(heapq._siftup, largest, 0)
+        order = _tiebreak()
+        threshold = largest[0][0]
+        for i in iterable:
+            k = key(i)
+            if k > threshold:
+                largest[0] = k, next(order), i
+                siftup()
+                threshold = largest[0][0]
+        return _undecorate(largest)
     largest = n * [float('-inf')]
     siftup = functools.partial(heapq._siftup, largest, 0)
     for i in iterable:
@@ -95,12 +230,24 @@ def nlargest_manual_heapreplace(n, iterable):
 # itertools.islice().
 
 # 13 % slowdown for large iterables.
-def nlargest_list2(n, iterable):
+def nlargest_list2(n, iterable, key=None):
     """Return the n largest items in the given iterable."""
     # Quite naïve method, keeping its own list of the n largest numbers at
     # every time and keeping track of the smallest item and its index in the
     # list for future replacement.
     get_min_index_value = functools.partial(min, key=lambda x: x[1])
+    if key is not None:
+        order = _tiebreak()
+        largest = _decorate(iterable[:n], key, order)
+        min_index, min_value = get_min_index_value(enumerate(largest))
+        threshold = min_value[0]
+        for i in itertools.islice(iterable, n, None):
+            k = key(i)
+            if k > threshold:
+                largest[min_index] = k, next(order), i
+                min_index, min_value = get_min_index_value(enumerate(largest))
+                threshold = min_value[0]
+        return _undecorate(largest)
     largest = iterable[:n]
     min_index, min_value = get_min_index_value(enumerate(largest))
     for i in itertools.islice(iterable, n, None):
@@ -112,7 +259,8 @@ def nlargest_list2(n, iterable):
 
 
 # 8 % slowdown for large iterables.
-def nlargest_heapreplace2(n, iterable):
+def nlargest_heapreplace2(n, iterable, key=None, unique=False,
+                          unique_key=None):
     """Return the n largest items in the given iterable."""
     # Uses the heapq.heapify structure for the list of largest numbers, to
     # replace the search for the minimal number at every turn. The search is
@@ -120,6 +268,20 @@ def nlargest_heapreplace2(n, iterable):
     # be a O(log n) operation rather than O(n) for an exhaustive search, with
     # the drawback of having to do more internal list element movements when
     # the new item is sifted into the structure.
+    if unique or unique_key is not None:
+        return _nlargest_unique(n, iterable, key, unique_key)
+    if key is not None:
+        order = _tiebreak()
+        largest = _decorate(iterable[:n], key, order)
+        heapq.heapify(largest)
+        push_larger = functools.partial(heapq.heapreplace, largest)
+        threshold = largest[0][0]
+        for i in itertools.islice(iterable, n, None):
+            k = key(i)
+            if k > threshold:
+                push_larger((k, next(order), i))
+                threshold = largest[0][0]
+        return _undecorate(largest)
     largest = iterable[:n]
     heapq.heapify(largest)
     push_larger = functools.partial(heapq.heapreplace, largest)
@@ -148,12 +310,28 @@ def nlargest_heappushpop2(n, iterable):
 
 
 # 7 % slowdown for large iterables.
-def nlargest_manual_heapreplace2(n, iterable):
+def nlargest_manual_heapreplace2(n, iterable, key=None, unique=False,
+                                 unique_key=None):
     """Return the n largest items in the given iterable."""
     # A test using a "manual" heapq.heapreplace equivalent through its internal
     # heapq._siftup function. The idea is that this should avoid some extra
     # tests performed by heapq.heapreplace, but in practice the same tests are
     # performed by heapq._siftup, so there is generally no speedup.
+    if unique or unique_key is not None:
+        return _nlargest_unique(n, iterable, key, unique_key)
+    if key is not None:
+        order = _tiebreak()
+        largest = _decorate(iterable[:n], key, order)
+        heapq.heapify(largest)
+        siftup = functools.partial(heapq._siftup, largest, 0)
+        threshold = largest[0][0]
+        for i in itertools.islice(iterable, n, None):
+            k = key(i)
+            if k > threshold:
+                largest[0] = k, next(order), i
+                siftup()
+                threshold = largest[0][0]
+        return _undecorate(largest)
     largest = iterable[:n]
     heapq.heapify(largest)
     siftup = functools.partial(heapq._siftup, largest, 0)
@@ -171,14 +349,26 @@ def nlargest_manual_heapreplace2(n, iterable):
 # These versions are faster than the vanilla functions for small iterable sizes
 # and seem to asymptotically approach them for large iterables, as expected.
 
-def nlargest_list3(n, iterable):
+def nlargest_list3(n, iterable, key=None):
     """Return the n largest items in the given iterable."""
     # Quite naïve method, keeping its own list of the n largest numbers at
     # every time and keeping track of the smallest item and its index in the
     # list for future replacement.
     iterator = iter(iterable)
-    largest = [next(iterator) for i in range(n)]
     get_min_index_value = functools.partial(min, key=lambda x: x[1])
+    if key is not None:
+        order = _tiebreak()
+        largest = _decorate(itertools.islice(iterator, n), key, order)
+        min_index, min_value = get_min_index_value(enumerate(largest))
+        threshold = min_value[0]
+        for i in iterator:
+            k = key(i)
+            if k > threshold:
+                largest[min_index] = k, next(order), i
+                min_index, min_value = get_min_index_value(enumerate(largest))
+                threshold = min_value[0]
+        return _undecorate(largest)
+    largest = [next(iterator) for i in range(n)]
     min_index, min_value = get_min_index_value(enumerate(largest))
     for i in iterator:
         if i > min_value:
@@ -188,7 +378,8 @@ def nlargest_list3(n, iterable):
     return largest
 
 
-def nlargest_heapreplace3(n, iterable):
+def nlargest_heapreplace3(n, iterable, key=None, unique=False,
+                          unique_key=None):
     """Return the n largest items in the given iterable."""
     # Uses the heapq.heapify structure for the list of largest numbers, to
     # replace the search for the minimal number at every turn. The search is
@@ -196,7 +387,21 @@ def nlargest_heapreplace3(n, iterable):
     # be a O(log n) operation rather than O(n) for an exhaustive search, with
     # the drawback of having to do more internal list element movements when
     # the new item is sifted into the structure.
+    if unique or unique_key is not None:
+        return _nlargest_unique(n, iterable, key, unique_key)
     iterator = iter(iterable)
+    if key is not None:
+        order = _tiebreak()
+        largest = _decorate(itertools.islice(iterator, n), key, order)
+        heapq.heapify(largest)
+        push_larger = functools.partial(heapq.heapreplace, largest)
+        threshold = largest[0][0]
+        for i in iterator:
+            k = key(i)
+            if k > threshold:
+                push_larger((k, next(order), i))
+                threshold = largest[0][0]
+        return _undecorate(largest)
     largest = [next(iterator) for i in range(n)]
     heapq.heapify(largest)
     push_larger = functools.partial(heapq.heapreplace, largest)
@@ -224,13 +429,29 @@ def nlargest_heappushpop3(n, iterable):
     return largest
 
 
-def nlargest_manual_heapreplace3(n, iterable):
+def nlargest_manual_heapreplace3(n, iterable, key=None, unique=False,
+                                 unique_key=None):
     """Return the n largest items in the given iterable."""
     # A test using a "manual" heapq.heapreplace equivalent through its internal
     # heapq._siftup function. The idea is that this should avoid some extra
     # tests performed by heapq.heapreplace, but in practice the same tests are
     # performed by heapq._siftup, so there is generally no speedup.
+    if unique or unique_key is not None:
+        return _nlargest_unique(n, iterable, key, unique_key)
     iterator = iter(iterable)
+    if key is not None:
+        order = _tiebreak()
+        largest = _decorate(itertools.islice(iterator, n), key, order)
+        heapq.heapify(largest)
+        siftup = functools.partial(heapq._siftup, largest, 0)
+        threshold = largest[0][0]
+        for i in iterator:
+            k = key(i)
+            if k > threshold:
+                largest[0] = k, next(order), i
+                siftup()
+                threshold = largest[0][0]
+        return _undecorate(largest)
     largest = [next(iterator) for i in range(n)]
     heapq.heapify(largest)
     siftup = functools.partial(heapq._siftup, largest, 0)
@@ -240,3 +461,756 @@ def nlargest_manual_heapreplace3(n, iterable):
             siftup()
     largest.sort()
     return largest
+
+
+# Deduplicating mode of the heap kernels. With unique=True they return the n
+# largest distinct items, and with unique_key=f the largest item for each of
+# the n best distinct values of f(item). The identities of the retained items
+# are kept in a dict next to the heap, so that a repeated item is rejected in
+# O(1) without touching the heap, and an identity is dropped from the dict as
+# soon as its item is evicted. Memory is thus bounded by n rather than by the
+# number of distinct items in the input. An evicted identity may re-enter the
+# heap later, since its retained item was no larger than any item retained
+# since. When the retained item of an identity improves, the new entry is
+# pushed and the old one left in the heap as stale, recognisable as no longer
+# being the dict's entry of its identity, like the dead entries in window.py.
+# Stale entries are dropped when they surface at the root, and the heap is
+# rebuilt from the dict once they make up half of it. All variants of a
+# kernel share the implementation below.
+
+def _nlargest_unique(n, iterable, key=None, unique_key=None):
+    """Return the n largest items in the given iterable with distinct
+    identities, the items themselves or their unique_key values."""
+    if n <= 0:
+        return []
+    iterator = iter(iterable)
+    if key is None and unique_key is None:
+        return _nlargest_distinct(n, iterator)
+    if key is None:
+        key = _identity
+    if unique_key is None:
+        unique_key = _identity
+    # Entries are (key, order, item, identity), identity → live entry.
+    order = _tiebreak()
+    members = {}
+    for i in iterator:
+        k, u = key(i), unique_key(i)
+        entry = members.get(u)
+        if entry is None:
+            members[u] = k, next(order), i, u
+            if len(members) == n:
+                break
+        elif k > entry[0]:
+            members[u] = k, next(order), i, u
+    else:
+        return [entry[2] for entry in sorted(members.values())]
+    largest = list(members.values())
+    heapq.heapify(largest)
+    threshold = largest[0][0]
+    for i in iterator:
+        k = key(i)
+        if k > threshold:
+            u = unique_key(i)
+            entry = members.get(u)
+            if entry is None:
+                members[u] = k, next(order), i, u
+                del members[heapq.heapreplace(largest, members[u])[3]]
+            elif k > entry[0]:
+                members[u] = k, next(order), i, u
+                if len(largest) >= 2 * n:
+                    largest = list(members.values())
+                    heapq.heapify(largest)
+                else:
+                    heapq.heappush(largest, members[u])
+            else:
+                continue
+            while members.get(largest[0][3]) is not largest[0]:
+                heapq.heappop(largest)
+            threshold = largest[0][0]
+    return [entry[2] for entry in sorted(members.values())]
+
+
+def _nlargest_distinct(n, iterator):
+    """Return the n largest distinct items from an iterator."""
+    largest = []
+    members = set()
+    for i in iterator:
+        if i not in members:
+            members.add(i)
+            largest.append(i)
+            if len(largest) == n:
+                break
+    else:
+        largest.sort()
+        return largest
+    heapq.heapify(largest)
+    push_larger = functools.partial(heapq.heapreplace, largest)
+    for i in iterator:
+        if i > largest[0] and i not in members:
+            members.remove(push_larger(i))
+            members.add(i)
+    largest.sort()
+    return largest
+
+
+def _identity(item):
+    return item
+
+
+# Vectorised engine for array-like input. Instead of passing every item
+# through the Python interpreter, the selection is done by NumPy's
+# introselect-based partitioning in a single C-level pass, after which only
+# the n selected items are sorted. Inputs supporting the buffer protocol
+# (numpy.ndarray, array.array, memoryview, bytes) are used without copying,
+# bytes as the unsigned byte values that iterating over them yields. Only
+# flat sequences of numbers are selected this way: anything else, e.g. tuples
+# or strings, would either be reshaped by NumPy or compared differently.
+
+# NumPy dtype kinds accepted by the vectorised engine.
+NUMERIC_KINDS = 'biuf'
+
+
+def _supports_buffer(obj):
+    """Check whether an object exposes the buffer protocol."""
+    try:
+        memoryview(obj)
+    except TypeError:
+        return False
+    return True
+
+
+def as_array(iterable):
+    """Return a one-dimensional numeric NumPy array view or copy of the given
+    iterable. Raise TypeError for other input."""
+    if numpy is None:
+        raise ImportError('the vectorised engine requires numpy')
+    if isinstance(iterable, numpy.ndarray):
+        values = iterable
+    elif _supports_buffer(iterable):
+        values = numpy.asarray(memoryview(iterable))
+    else:
+        if not hasattr(iterable, '__len__'):
+            iterable = list(iterable)
+        values = numpy.asarray(iterable)
+    if values.ndim != 1 or values.dtype.kind not in NUMERIC_KINDS:
+        raise TypeError('the vectorised engine takes a flat sequence of '
+                        'numbers, not a {}-d {} array'.format(values.ndim,
+                                                              values.dtype))
+    return values
+
+
+def _numeric_buffer(obj):
+    """Return a buffer-protocol object as a NumPy array for the vectorised
+    engine, or None if NumPy is missing or the object does not qualify."""
+    if numpy is None or not _supports_buffer(obj):
+        return None
+    try:
+        return as_array(obj)
+    except (TypeError, ValueError):
+        return None
+
+
+def nlargest_argpartition(n, iterable, indices=False):
+    """Return the n largest items in the given flat sequence of numbers, or
+    with indices=True their positions in the input, ordered by ascending
+    value.
+    """
+    values = as_array(iterable)
+    if n <= 0:
+        return []
+    if not indices:
+        if n >= len(values):
+            return numpy.sort(values).tolist()
+        largest = numpy.partition(values, -n)[-n:]
+        largest.sort()
+        return largest.tolist()
+    if n >= len(values):
+        return numpy.argsort(values, kind='stable').tolist()
+    selected = numpy.argpartition(values, -n)[-n:]
+    return selected[numpy.argsort(values[selected], kind='stable')].tolist()
+
+
+# The kernels above all do O(N log n) or O(N·n) work, which leaves a full sort
+# as the only option when n is a sizeable fraction of N. nlargest_select
+# instead selects in expected O(N) on a single copy of the input, with
+# Floyd–Rivest style pivots: the pivot is taken from a sorted random sample
+# just below where the n-th largest item is expected, so that a single
+# partitioning pass usually leaves little more than the n largest items. The
+# partition is three-way, so runs of duplicates equal to the pivot are settled
+# in one go, and each pass is a list comprehension running at the speed of
+# the interpreter's specialised comparisons. Should the sampled pivots fail to
+# converge, e.g. for adversarial input, the pivot falls back to the median of
+# medians, which guarantees linear time. Only the n selected items are sorted.
+
+_select_random = random.Random()
+
+
+def _sample_pivot(items, k):
+    """Pivot expected slightly below the k-th largest of the items."""
+    size = len(items)
+    sample_size = min(size, int(size ** (2 / 3)) + 1)
+    sample = sorted(_select_random.sample(items, sample_size))
+    expected_rank = sample_size * k / size
+    index = int(sample_size - expected_rank - math.sqrt(sample_size))
+    return sample[max(index, 0)]
+
+
+def _median_of_medians(items):
+    """Pivot between the 30th and 70th percentile of the items: the median of
+    the medians of groups of five."""
+    medians = []
+    for start in range(0, len(items), 5):
+        group = sorted(items[start:start + 5])
+        medians.append(group[len(group) // 2])
+    return min(_select_largest(medians, (len(medians) + 1) // 2, True))
+
+
+def _select_largest(items, k, median_pivots=False):
+    """Return the k largest of a list of items in ascending order, for
+    0 < k <= len(items). With median_pivots, every pivot is a median of
+    medians instead of a sampled one.
+    """
+    settled = []
+    rounds = 2 * len(items).bit_length()
+    while True:
+        size = len(items)
+        if size - k <= max(SELECT_CUTOFF, k // 8):
+            items.sort()
+            return items[size - k:] + sorted(settled)
+        rounds -= 1
+        if median_pivots or rounds < 0:
+            pivot = _median_of_medians(items)
+        else:
+            pivot = _sample_pivot(items, k)
+        upper = [i for i in items if i > pivot]
+        if len(upper) >= k:
+            items = upper
+            continue
+        equal = [i for i in items if i == pivot]
+        if len(upper) + len(equal) >= k:
+            upper.sort()
+            return equal[:k - len(upper)] + upper + sorted(settled)
+        settled += upper + equal
+        k -= len(upper) + len(equal)
+        items = [i for i in items if i < pivot]
+
+
+def nlargest_select(n, iterable, key=None):
+    """Return the n largest items in the given iterable. Expected O(N)
+    performance regardless of n, followed by sorting the n selected items.
+    """
+    if key is not None:
+        order = _tiebreak()
+        items = _decorate(iterable, key, order)
+    else:
+        items = list(iterable)
+    n = min(n, len(items))
+    if n <= 0:
+        return []
+    largest = _select_largest(items, n)
+    if key is not None:
+        return _undecorate(largest)
+    return largest
+
+
+# For large N nearly every item fails the threshold test, but the kernels above
+# still execute a few bytecodes per item to find that out. The chunked kernel
+# instead pulls fixed-size chunks from the iterator and rejects them in bulk
+# against the threshold in effect at the start of the chunk: with a boolean
+# mask for buffer-protocol input when NumPy is available, which runs at C
+# speed, or with a list comprehension otherwise. Only the survivors reach the
+# heap, where heappushpop discards those made obsolete by earlier survivors of
+# the same chunk.
+#
+# For general iterables, filter() with an operator.lt partial (or a bound
+# threshold.__lt__) turned out about twice as slow as the comprehension on
+# CPython 3.11, whose specialised comparison beats the C-level call per item.
+# Neither beats nlargest_list3 for random input, so the pure Python path
+# mainly serves to give plain iterators the same interface.
+
+def nlargest_chunked(n, iterable, chunk_size=CHUNK_SIZE):
+    """Return the n largest items in the given iterable, rejecting items
+    below the running threshold chunk by chunk.
+    """
+    if n <= 0:
+        return []
+    values = _numeric_buffer(iterable)
+    if values is not None:
+        return _nlargest_chunked_array(n, values, chunk_size)
+    iterator = iter(iterable)
+    largest = list(itertools.islice(iterator, n))
+    heapq.heapify(largest)
+    push = functools.partial(heapq.heappushpop, largest)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            break
+        threshold = largest[0]
+        for i in [i for i in chunk if i > threshold]:
+            push(i)
+    largest.sort()
+    return largest
+
+
+def _nlargest_chunked_array(n, values, chunk_size):
+    """Chunked selection over a NumPy array using boolean masks."""
+    largest = []
+    _push_chunked_array(largest, n, values, chunk_size)
+    largest.sort()
+    return largest
+
+
+def _push_chunked_array(largest, n, values, chunk_size, start=None, step=1):
+    """Push the items of a NumPy array onto the min-heap `largest` of at most
+    n items, rejecting those below its threshold chunk by chunk with boolean
+    masks. Given a start position, push (item, start + index·step) pairs
+    instead, e.g. with the byte offsets of the items in a file.
+    """
+    head = values[:n - len(largest)]
+    if start is None:
+        largest.extend(head.tolist())
+    else:
+        largest.extend(zip(head.tolist(),
+                           range(start, start + len(head) * step, step)))
+    heapq.heapify(largest)
+    if not largest:
+        return
+    push = functools.partial(heapq.heappushpop, largest)
+    for first in range(len(head), len(values), chunk_size):
+        chunk = values[first:first + chunk_size]
+        if start is None:
+            for i in chunk[chunk > largest[0]].tolist():
+                push(i)
+            continue
+        selected = numpy.flatnonzero(chunk > largest[0][0])
+        positions = start + (first + selected) * step
+        for pair in zip(chunk[selected].tolist(), positions.tolist()):
+            push(pair)
+
+
+# Multi-core selection: the input is split into contiguous shards, each shard
+# is reduced to its own n largest items by a kernel in a worker process and
+# the sorted per-shard results are merged. Sequences are pickled shard by
+# shard, whereas array-backed input is copied once into shared memory which
+# the workers map without any pickling of the data.
+
+def _shard_nlargest(kernel, n, shard):
+    """Run a kernel on a single shard, which may be shorter than n."""
+    if len(shard) > n:
+        return kernel(n, shard)
+    if numpy is not None and isinstance(shard, numpy.ndarray):
+        # Python scalars, like the kernels return.
+        return numpy.sort(shard).tolist()
+    return sorted(shard)
+
+
+def _shared_shard_nlargest(kernel, n, name, dtype, start, stop):
+    """Run a kernel on a slice of an array in named shared memory."""
+    shm = shared_memory.SharedMemory(name=name)
+    dtype = numpy.dtype(dtype)
+    shard = numpy.ndarray((stop - start,), dtype=dtype, buffer=shm.buf,
+                          offset=start * dtype.itemsize)
+    try:
+        return _shard_nlargest(kernel, n, shard)
+    finally:
+        del shard
+        shm.close()
+
+
+def shard_bounds(element_count, shards):
+    """Split element_count items into at most `shards` contiguous (start, stop)
+    ranges of nearly equal length."""
+    shards = max(1, min(shards, element_count))
+    size, remainder = divmod(element_count, shards)
+    bounds = []
+    start = 0
+    for shard in range(shards):
+        stop = start + size + (shard < remainder)
+        bounds.append((start, stop))
+        start = stop
+    return bounds
+
+
+def parallel_nlargest(n, data, workers=None, kernel=None):
+    """Return the n largest items in the given sequence or array, splitting
+    the work over `workers` processes (default: one per CPU), but at most
+    one per SHARD_MIN_SIZE items. Shorter input is reduced in-process.
+
+    kernel defaults to nlargest_argpartition for buffer-protocol input when
+    NumPy is available, and to nlargest_heapreplace3 otherwise.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if n <= 0:
+        return []
+    values = _numeric_buffer(data)
+    use_shared_memory = values is not None
+    if kernel is None:
+        kernel = (nlargest_argpartition if use_shared_memory
+                  else nlargest_heapreplace3)
+    if use_shared_memory:
+        data = values
+    workers = min(workers, len(data) // SHARD_MIN_SIZE)
+    bounds = shard_bounds(len(data), workers)
+    if len(bounds) <= 1:
+        return _shard_nlargest(kernel, n, data)
+
+    with concurrent.futures.ProcessPoolExecutor(len(bounds)) as executor:
+        if use_shared_memory:
+            shm = shared_memory.SharedMemory(create=True,
+                                             size=max(1, data.nbytes))
+            try:
+                shared = numpy.ndarray(data.shape, dtype=data.dtype,
+                                       buffer=shm.buf)
+                shared[:] = data
+                del shared
+                futures = [
+                    executor.submit(_shared_shard_nlargest, kernel, n,
+                                    shm.name, data.dtype.str, start, stop)
+                    for start, stop in bounds
+                ]
+                parts = [future.result() for future in futures]
+            finally:
+                shm.close()
+                shm.unlink()
+        else:
+            futures = [
+                executor.submit(_shard_nlargest, kernel, n, data[start:stop])
+                for start, stop in bounds
+            ]
+            parts = [future.result() for future in futures]
+
+    return list(heapq.merge(*parts))[-n:]
+
+
+class TopN:
+    """Accumulator of the n largest items seen so far.
+
+    Uses the same min-heap and threshold test as nlargest_heapreplace3, but
+    keeps the heap between calls so that items can be added incrementally and
+    partial accumulators, e.g. from different workers, can be merged.
+    Instances are picklable.
+    """
+    __slots__ = ('n', '_heap')
+
+    def __init__(self, n, iterable=()):
+        self.n = n
+        self._heap = []
+        self.extend(iterable)
+
+    def __repr__(self):
+        return '{}({}, {})'.format(type(self).__name__, self.n, self.result())
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __getstate__(self):
+        return self.n, self._heap
+
+    def __setstate__(self, state):
+        self.n, self._heap = state
+
+    @property
+    def threshold(self):
+        """The smallest retained item, which any new item has to beat, or None
+        while fewer than n items have been seen."""
+        if len(self._heap) < self.n:
+            return None
+        return self._heap[0]
+
+    def push(self, item):
+        """Add a single item."""
+        heap = self._heap
+        if len(heap) < self.n:
+            heapq.heappush(heap, item)
+        elif heap and item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def extend(self, iterable):
+        """Add all items from an iterable."""
+        heap = self._heap
+        iterator = iter(iterable)
+        if len(heap) < self.n:
+            heap.extend(itertools.islice(iterator, self.n - len(heap)))
+            heapq.heapify(heap)
+        if not heap:
+            return
+        push_larger = functools.partial(heapq.heapreplace, heap)
+        for i in iterator:
+            if i > heap[0]:
+                push_larger(i)
+
+    async def aextend(self, aiterable, batched=False):
+        """Add all items from an asynchronous iterable. With batched=True the
+        iterable yields batches (e.g. lists) of items, which are added with
+        extend() so that only one await is paid per batch.
+        """
+        if batched:
+            async for batch in aiterable:
+                self.extend(batch)
+            return
+        heap = self._heap
+        aiterator = aiterable.__aiter__()
+        while len(heap) < self.n:
+            try:
+                i = await aiterator.__anext__()
+            except StopAsyncIteration:
+                return
+            heapq.heappush(heap, i)
+        if not heap:
+            return
+        push_larger = functools.partial(heapq.heapreplace, heap)
+        async for i in aiterator:
+            if i > heap[0]:
+                push_larger(i)
+
+    def merge(self, other):
+        """Add the items retained by another accumulator and return self."""
+        self.extend(other._heap)
+        return self
+
+    def result(self):
+        """Return the retained items in ascending order."""
+        return sorted(self._heap)
+
+
+async def anlargest(n, aiterable, batched=False):
+    """Return the n largest items in the given asynchronous iterable, which
+    with batched=True yields batches of items rather than single items.
+    """
+    top = TopN(n)
+    await top.aextend(aiterable, batched=batched)
+    return top.result()
+
+
+# The dispatcher below picks one of the kernels above for every call. Which
+# kernel wins depends on the number of elements N and the pick size n, so the
+# crossover points are read from a profile calibrated from benchmark output
+# (see calibrate.py) rather than hard-coded.
+
+def load_profile(path=PROFILE_FILE):
+    """Load dispatch thresholds from the INI-style section "Dispatch" of the
+    given profile file, falling back to DEFAULT_PROFILE for missing fields or
+    a missing file.
+    """
+    cparser = configparser.ConfigParser()
+    if not cparser.read(path) or not cparser.has_section('Dispatch'):
+        return DEFAULT_PROFILE
+    section = cparser['Dispatch']
+    return Profile(
+        sort_ratio=section.getfloat('sort_ratio', DEFAULT_PROFILE.sort_ratio),
+        list_max_pick=section.getint(
+            'list_max_pick', DEFAULT_PROFILE.list_max_pick
+        ),
+        select_min_count=section.getint(
+            'select_min_count', DEFAULT_PROFILE.select_min_count
+        ),
+    )
+
+
+PROFILE = load_profile()
+
+
+def choose_strategy(n, element_count=None, profile=None):
+    """Return the kernel expected to be fastest for picking n items out of
+    element_count items, where element_count is None for iterables of unknown
+    length. Large picks are selected by partitioning, or for few items by a
+    full sort.
+    """
+    if profile is None:
+        profile = PROFILE
+    if element_count is not None and n >= profile.sort_ratio * element_count:
+        if element_count >= profile.select_min_count:
+            return nlargest_select
+        return nlargest_ref_sorted
+    if n <= profile.list_max_pick:
+        return nlargest_list3
+    return nlargest_heapreplace3
+
+
+def nlargest(n, iterable, key=None, unique=False, unique_key=None):
+    """Return the n largest items in the given iterable, using the strategy
+    expected to be fastest for the type and size of the input and the pick.
+
+    With unique=True, return the n largest distinct items, and with
+    unique_key, the largest item for each of the n best distinct unique_key
+    values, in both cases by the deduplicating heap kernel.
+    """
+    if n <= 0:
+        return []
+    if unique or unique_key is not None:
+        return _nlargest_unique(n, iterable, key, unique_key)
+    if key is None:
+        values = _numeric_buffer(iterable)
+        if values is not None:
+            return nlargest_argpartition(n, values)
+    try:
+        element_count = len(iterable)
+    except TypeError:
+        # Generators and other iterators: consume the first n items up front
+        # so that short inputs are handled before a kernel is chosen.
+        iterator = iter(iterable)
+        head = list(itertools.islice(iterator, n))
+        if len(head) < n:
+            return nlargest_ref_sorted(n, head, key=key)
+        kernel = choose_strategy(n)
+        return kernel(n, itertools.chain(head, iterator), key=key)
+    if n >= element_count:
+        return nlargest_ref_sorted(n, iterable, key=key)
+    return choose_strategy(n, element_count)(n, iterable, key=key)
+
+
+# Counterparts selecting the n smallest items, keeping the n smallest items
+# seen so far in a max-heap by the heapq module's internal max-heap functions.
+# Like their nlargest_* originals, they return the items in ascending order,
+# and keyed selection keeps the earliest of items with equal keys.
+
+def nsmallest_ref_sorted(n, iterable, key=None):
+    """Full list sorting for reference."""
+    return sorted(iterable, key=key)[:n]
+
+
+def nsmallest_ref_heapq(n, iterable, key=None):
+    """Vanilla implementation from the heapq module."""
+    return heapq.nsmallest(n, iterable, key=key)
+
+
+def nsmallest_list3(n, iterable, key=None):
+    """Return the n smallest items in the given iterable."""
+    iterator = iter(iterable)
+    get_max_index_value = functools.partial(max, key=lambda x: x[1])
+    if key is not None:
+        order = itertools.count()
+        smallest = _decorate(itertools.islice(iterator, n), key, order)
+        if not smallest:
+            return []
+        max_index, max_value = get_max_index_value(enumerate(smallest))
+        threshold = max_value[0]
+        for i in iterator:
+            k = key(i)
+            if k < threshold:
+                smallest[max_index] = k, next(order), i
+                max_index, max_value = get_max_index_value(enumerate(smallest))
+                threshold = max_value[0]
+        return _undecorate(smallest)
+    smallest = list(itertools.islice(iterator, n))
+    if not smallest:
+        return []
+    max_index, max_value = get_max_index_value(enumerate(smallest))
+    for i in iterator:
+        if i < max_value:
+            smallest[max_index] = i
+            max_index, max_value = get_max_index_value(enumerate(smallest))
+    smallest.sort()
+    return smallest
+
+
+def nsmallest_heapreplace3(n, iterable, key=None):
+    """Return the n smallest items in the given iterable."""
+    iterator = iter(iterable)
+    if key is not None:
+        order = itertools.count()
+        smallest = _decorate(itertools.islice(iterator, n), key, order)
+        if not smallest:
+            return []
+        heapq._heapify_max(smallest)
+        push_smaller = functools.partial(heapq._heapreplace_max, smallest)
+        threshold = smallest[0][0]
+        for i in iterator:
+            k = key(i)
+            if k < threshold:
+                push_smaller((k, next(order), i))
+                threshold = smallest[0][0]
+        return _undecorate(smallest)
+    smallest = list(itertools.islice(iterator, n))
+    if not smallest:
+        return []
+    heapq._heapify_max(smallest)
+    push_smaller = functools.partial(heapq._heapreplace_max, smallest)
+    for i in iterator:
+        if i < smallest[0]:
+            push_smaller(i)
+    smallest.sort()
+    return smallest
+
+
+# The selection kernel for the n largest items → its nsmallest counterpart.
+_SMALLEST_KERNELS = {
+    nlargest_ref_sorted: nsmallest_ref_sorted,
+    nlargest_select: nsmallest_ref_sorted,
+    nlargest_list3: nsmallest_list3,
+    nlargest_heapreplace3: nsmallest_heapreplace3,
+}
+
+
+def nsmallest(n, iterable, key=None):
+    """Return the n smallest items in the given iterable, in ascending order,
+    using the counterpart of the kernel nlargest would choose.
+    """
+    if n <= 0:
+        return []
+    try:
+        element_count = len(iterable)
+    except TypeError:
+        element_count = None
+    else:
+        if n >= element_count:
+            return sorted(iterable, key=key)
+    kernel = _SMALLEST_KERNELS[choose_strategy(n, element_count)]
+    return kernel(n, iterable, key=key)
+
+
+def nextremes(n, iterable, key=None):
+    """Return (n smallest, n largest) items of the given iterable, both in
+    ascending order, in a single pass.
+
+    The n largest items are kept in a min-heap and the n smallest in a
+    max-heap, both initialised with the first n items. Every further item is
+    fetched, and its key computed, once, and rejected by two comparisons when
+    it lies between the two thresholds, which for small n is nearly every
+    item. The thresholds are tested independently, since an item can belong
+    to both heaps until they have parted.
+    """
+    if n <= 0:
+        return [], []
+    iterator = iter(iterable)
+    if key is not None:
+        # Both heaps keep the earliest of tied items, which takes opposite
+        # tiebreaks, from the same insertion index.
+        order = itertools.count()
+        smallest = _decorate(itertools.islice(iterator, n), key, order)
+        largest = [(k, -index, i) for k, index, i in smallest]
+    else:
+        largest = list(itertools.islice(iterator, n))
+        smallest = list(largest)
+    heapq.heapify(largest)
+    heapq._heapify_max(smallest)
+    if not largest:
+        return [], []
+    if key is not None:
+        push_larger = functools.partial(heapq.heapreplace, largest)
+        push_smaller = functools.partial(heapq._heapreplace_max, smallest)
+        high, low = largest[0][0], smallest[0][0]
+        for i in iterator:
+            k = key(i)
+            index = next(order)
+            if k > high:
+                push_larger((k, -index, i))
+                high = largest[0][0]
+            if k < low:
+                push_smaller((k, index, i))
+                low = smallest[0][0]
+        return _undecorate(smallest), _undecorate(largest)
+    push_larger = functools.partial(heapq.heapreplace, largest)
+    push_smaller = functools.partial(heapq._heapreplace_max, smallest)
+    high, low = largest[0], smallest[0]
+    for i in iterator:
+        if i > high:
+            push_larger(i)
+            high = largest[0]
+        if i < low:
+            push_smaller(i)
+            low = smallest[0]
+    smallest.sort()
+    largest.sort()
+    return smallest, largest
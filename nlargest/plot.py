@@ -5,7 +5,6 @@ import itertools
 import os.path
 import sys
 
-from benchmark import BenchmarkResult, TimeitResult  # noqa
 import plotter
 
 
@@ -83,29 +82,114 @@ def plot_ref_against_init_2(data, **kwargs):
     plotter.plot_select_series(data, plot_series, **kwargs)
 
 
+def plot_ref_against_vectorized(data, **kwargs):
+    """Plot reference implementations against the vectorised engine."""
+    plot_series = [
+        ('nlargest_ref_sorted', '-x'),
+        ('nlargest_ref_heapq', '-x'),
+        ('nlargest_list3', '-*'),
+        ('nlargest_heapreplace3', '-o'),
+        ('nlargest_argpartition', '-d'),
+    ]
+    plotter.plot_select_series(data, plot_series, **kwargs)
+
+
+def compare_picks(data, **kwargs):
+    """Plot time against pick size for the list, heap and reference
+    implementations at a fixed element count."""
+    plot_series = [
+        ('nlargest_ref_sorted', '-x'),
+        ('nlargest_ref_heapq', '-x'),
+        ('nlargest_list3', '-*'),
+        ('nlargest_heapreplace3', '-o'),
+        ('nlargest_argpartition', '-d'),
+        ('nlargest_select', '-^'),
+    ]
+    plotter.plot_select_series(data, plot_series, xlabel='Pick', **kwargs)
+
+
+# Memory profile fields and their axis labels.
+MEMORY_LABELS = {
+    'memory_peak': 'Peak traced memory $/$B',
+    'memory_rss': 'Resident set size growth $/$B',
+    'memory_blocks': 'Retained memory blocks',
+}
+
+
+def compare_memory(data, **kwargs):
+    """Plot a memory profile field against element count for all
+    functions."""
+    plotter.plot_all_series(data, **kwargs)
+
+
 def main(cli_args):
     args = parse_cli_arguments(cli_args)
 
     with open(args.file, 'br') as f:
-        plot_data = plotter.dict_of_numpy_data(f)
+        results = plotter.load_results(f)
 
     axes = {
         'small': [1e1, 1e4, 1e-6, 4e-3],
         'large': [1e1, 1e7, 1e-6, 2e1],
     }
 
-    plot_functions = (v for k, v in globals().items() if k.startswith('plot_'))
+    plot_functions = [
+        v for k, v in globals().items() if k.startswith('plot_')
+    ]
 
     filename = os.path.basename(args.file)
-    for function, (axis_name, axis) \
-            in itertools.product(plot_functions, axes.items()):
-        figure_name = '{}__{}__axis_{}.png'.format(
-            filename,
-            function.__name__,
-            axis_name
-        )
-        figure_path = os.path.join(args.figure_dir, figure_name)
-        function(plot_data, axis=axis, save=args.save, figure_path=figure_path)
+    for distribution, pick in itertools.product(
+            plotter.distributions(results), plotter.picks(results)):
+        plot_data = plotter.dict_of_numpy_data(results, distribution, pick)
+        title = plotter.plot_title(distribution, pick)
+        for function, (axis_name, axis) \
+                in itertools.product(plot_functions, axes.items()):
+            figure_name = '{}__{}__pick_{}__{}__axis_{}.png'.format(
+                filename,
+                distribution,
+                pick,
+                function.__name__,
+                axis_name
+            )
+            figure_path = os.path.join(args.figure_dir, figure_name)
+            function(plot_data, axis=axis, save=args.save,
+                     figure_path=figure_path, title=title)
+
+    if plotter.has_memory(results):
+        for distribution, pick, (field, label) in itertools.product(
+                plotter.distributions(results), plotter.picks(results),
+                MEMORY_LABELS.items()):
+            plot_data = plotter.dict_of_numpy_data(results, distribution,
+                                                   pick, field)
+            figure_name = '{}__{}__pick_{}__{}.png'.format(
+                filename,
+                distribution,
+                pick,
+                field
+            )
+            figure_path = os.path.join(args.figure_dir, figure_name)
+            compare_memory(
+                plot_data, save=args.save, figure_path=figure_path,
+                title=plotter.plot_title(distribution, pick), ylabel=label
+            )
+
+    for distribution in plotter.distributions(results):
+        for element_count in plotter.pick_element_counts(results,
+                                                         distribution):
+            plot_data = plotter.dict_of_numpy_pick_data(
+                results, element_count, distribution
+            )
+            figure_name = '{}__{}__elements_{}__compare_picks.png'.format(
+                filename,
+                distribution,
+                element_count
+            )
+            figure_path = os.path.join(args.figure_dir, figure_name)
+            compare_picks(
+                plot_data, save=args.save, figure_path=figure_path,
+                title=plotter.plot_title(distribution,
+                                         element_count=element_count)
+            )
 
 
 if __name__ == '__main__':
@@ -1,39 +1,112 @@
 #!/usr/bin/env python3
 """Utility functions for plotting benchmark results with Matplotlib."""
-import collections
 import matplotlib.pyplot as plt
 import numpy as np
-import pickle
 
+import store
 
-# numpy column selectors.
+
+# numpy column selectors: x, y and the lower and upper error of y.
 X = slice(None), slice(0, 1)
-Y = slice(None), slice(1, None)
+Y = slice(None), slice(1, 2)
+ERROR = slice(None), slice(2, 4)
+
+
+def load_results(f):
+    """Load benchmark results as a structured array."""
+    _, records = store.load(f)
+    return records
+
+
+def distributions(data):
+    """List the input distributions present in benchmark results."""
+    return np.unique(data['distribution']).tolist()
+
+
+def picks(data):
+    """List the pick sizes present in benchmark results."""
+    return np.unique(data['pick']).tolist()
+
+
+def pick_element_counts(data, distribution='random'):
+    """List the element counts measured with more than one pick size."""
+    cells = np.unique(
+        data[data['distribution'] == distribution][['element_count', 'pick']]
+    )
+    counts, picks_per_count = np.unique(cells['element_count'],
+                                        return_counts=True)
+    return counts[picks_per_count > 1].tolist()
 
 
-def dict_of_numpy_data(f):
-    """Load test results into a dictionary."""
-    data = pickle.load(f)
+def series_by_function(data, mask, x_field, y_field='time'):
+    """Split the masked results into a dictionary of function name → array of
+    (x_field, y_field, lower error, upper error) rows sorted by x_field.
 
-    plot_series = collections.defaultdict(list)
-    for function, element_count, (loops, repetition, time) in data:
-        plot_series[function].append((element_count, time))
-    return {k: np.array(v) for k, v in plot_series.items()}
+    Times of statistical runs are represented by their median, with errors
+    spanning the confidence interval of the median. Other times, and other
+    fields such as memory_peak, have NaN errors. Results without a value of
+    y_field are left out.
+    """
+    mask = mask & ~np.isnan(data[y_field])
+    selected = np.sort(data[mask], order=['function', x_field])
+    functions, starts = np.unique(selected['function'], return_index=True)
+    y = selected[y_field].astype(float)
+    errors = np.full((2, len(selected)), np.nan)
+    if y_field == 'time':
+        median = selected['median']
+        y = np.where(np.isnan(median), y, median)
+        errors = y - selected['ci_low'], selected['ci_high'] - y
+    columns = np.column_stack((selected[x_field], y, *errors))
+    return dict(zip(functions.tolist(), np.split(columns, starts[1:])))
+
+
+def dict_of_numpy_data(data, distribution='random', pick=5, y_field='time'):
+    """Arrange the test results of an input distribution and pick size in a
+    dictionary of time, or another field, against element count."""
+    mask = (data['distribution'] == distribution) & (data['pick'] == pick)
+    return series_by_function(data, mask, 'element_count', y_field)
+
+
+def has_memory(data):
+    """Whether any of the benchmark results was memory profiled."""
+    return bool((~np.isnan(data['memory_peak'])).any())
+
+
+def dict_of_numpy_pick_data(data, element_count, distribution='random'):
+    """Arrange the test results of an input distribution and element count in
+    a dictionary of time against pick size."""
+    mask = ((data['distribution'] == distribution)
+            & (data['element_count'] == element_count))
+    return series_by_function(data, mask, 'pick')
+
+
+def plot_title(distribution='random', pick=5, element_count=None):
+    """Describe the fixed parameters of a plot."""
+    fixed = ('pick {}'.format(pick) if element_count is None
+             else '{} elements'.format(element_count))
+    return ('Performance metrics of nlargest functions ({}) for fixed-seed {} '
+            'input data'.format(fixed, distribution))
 
 
 def series_plotter(input_data, *, axis=None, compress_legend=False, save=False,
-                   figure_path=None):
+                   figure_path=None, title=None, xlabel='Elements',
+                   ylabel='Time $/$s'):
     """Prototype plotting function."""
     default_style = '-x'
     for (label, style), data in input_data:
         if style is None:
             style = default_style
-        plt.loglog(data[X], data[Y], style, label=label)
+        if len(data):
+            line, = plt.loglog(data[X], data[Y], style, label=label)
+            errors = data[ERROR]
+            if not np.isnan(errors).all():
+                plt.errorbar(data[X].ravel(), data[Y].ravel(),
+                             yerr=np.nan_to_num(errors).T, fmt='none',
+                             ecolor=line.get_color(), capsize=2)
 
-    plt.suptitle('Performance metrics of nlargest functions (pick 5) for '
-                 'fixed-seed randomized input data')
-    plt.xlabel('Elements')
-    plt.ylabel('Time $/$s')
+    plt.suptitle(plot_title() if title is None else title)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
     if axis is not None:
         plt.axis(axis)
     fontsize = 8 if compress_legend else 10
@@ -57,4 +130,6 @@ def plot_all_series(data, **kwargs):
 
 def plot_select_series(data, plot_series, **kwargs):
     """Plot series selected by name."""
-    series_plotter(((k, data[k[0]]) for k in plot_series), **kwargs)
+    series_plotter(
+        ((k, data[k[0]]) for k in plot_series if k[0] in data), **kwargs
+    )
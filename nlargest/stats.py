@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Robust summary statistics of the repeated timings of a measurement."""
+from collections import namedtuple
+
+import numpy as np
+
+
+# Confidence level and number of resamples of bootstrap confidence intervals.
+CONFIDENCE = 0.95
+RESAMPLES = 2000
+
+
+# Relative interquartile range above which a measurement counts as noisy.
+NOISE_THRESHOLD = 0.05
+
+
+Summary = namedtuple('Summary', 'median q1 q3 ci_low ci_high')
+
+
+def bootstrap_median_ci(times, confidence=CONFIDENCE, resamples=RESAMPLES,
+                        seed=0):
+    """Return a percentile bootstrap confidence interval of the median."""
+    times = np.asarray(times, dtype=float)
+    rng = np.random.default_rng(seed)
+    samples = rng.choice(times, size=(resamples, len(times)))
+    medians = np.median(samples, axis=1)
+    tail = (1 - confidence) / 2
+    low, high = np.quantile(medians, [tail, 1 - tail])
+    return float(low), float(high)
+
+
+def summarize(times, confidence=CONFIDENCE, resamples=RESAMPLES):
+    """Summarize repeated timings by median, quartiles and a bootstrap
+    confidence interval of the median. All fields are NaN without timings."""
+    if not len(times):
+        return Summary(*[float('nan')] * len(Summary._fields))
+    q1, median, q3 = np.quantile(times, [0.25, 0.5, 0.75]).tolist()
+    ci_low, ci_high = bootstrap_median_ci(times, confidence, resamples)
+    return Summary(median, q1, q3, ci_low, ci_high)
+
+
+def relative_iqr(times):
+    """Interquartile range of timings relative to their median."""
+    q1, median, q3 = np.quantile(times, [0.25, 0.5, 0.75])
+    return float((q3 - q1) / median)
+
+
+def bootstrap_ratio_ci(base, new, confidence=CONFIDENCE, resamples=RESAMPLES,
+                       seed=0):
+    """Return a percentile bootstrap confidence interval of the ratio of the
+    median of the `new` timings to the median of the `base` timings."""
+    base = np.asarray(base, dtype=float)
+    new = np.asarray(new, dtype=float)
+    rng = np.random.default_rng(seed)
+    base_medians = np.median(rng.choice(base, (resamples, len(base))), axis=1)
+    new_medians = np.median(rng.choice(new, (resamples, len(new))), axis=1)
+    tail = (1 - confidence) / 2
+    low, high = np.quantile(new_medians / base_medians, [tail, 1 - tail])
+    return float(low), float(high)
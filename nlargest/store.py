@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""Columnar, appendable storage of benchmark results.
+
+A results file starts with a magic line and a line of JSON run metadata,
+followed by fixed-size records of RESULT_DTYPE that are appended as the
+measurements finish. The records load into a NumPy structured array without
+any per-row Python code, and a partially written trailing record, e.g. after a
+crash, is ignored. Besides the best time, a record holds the time of every
+repetition of a statistical run, padded with NaN, their median, quartiles
+and bootstrap confidence interval of the median, and the memory profile.
+Columns that were not measured are NaN. Pickled lists of BenchmarkResult, as
+saved by earlier versions of benchmark.py, can still be loaded.
+
+A result cache is a separate file of JSON lines mapping cache keys to timings
+and memory profiles, appended to as measurements finish and reread by the next
+run.
+"""
+import json
+import pickle
+import platform
+import socket
+import sys
+from datetime import datetime
+
+import numpy as np
+
+import memory
+import stats
+
+
+MAGIC = b'NLARGEST-RESULTS 1\n'
+
+
+# Maximum number of repetitions recorded per result.
+MAX_TIMES = 64
+
+
+MEMORY_FIELDS = ['memory_' + field for field in memory.MemoryResult._fields]
+
+
+# Columns of the fields of a BenchmarkResult and its TimeitResult.
+TIMING_FIELDS = ['function', 'element_count', 'distribution', 'pick',
+                 'loops', 'repetitions', 'time', 'times']
+
+
+RESULT_DTYPE = np.dtype([
+    ('function', '<U64'),
+    ('element_count', '<i8'),
+    ('distribution', '<U32'),
+    ('pick', '<i8'),
+    ('loops', '<i8'),
+    ('repetitions', '<i8'),
+    ('time', '<f8'),
+    ('times', '<f8', (MAX_TIMES,)),
+] + [
+    (field, '<f8') for field in [*stats.Summary._fields, *MEMORY_FIELDS]
+])
+
+
+def run_metadata(**extra):
+    """Describe the environment of a benchmark run, plus extra fields."""
+    metadata = {
+        'python_version': platform.python_version(),
+        'python_implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'hostname': socket.gethostname(),
+        'started': datetime.now().isoformat(),
+        'argv': sys.argv,
+    }
+    metadata.update(extra)
+    return metadata
+
+
+def _padded_times(times):
+    """Pad repetition times with NaN to MAX_TIMES."""
+    if len(times) > MAX_TIMES:
+        raise ValueError('more than {} repetitions'.format(MAX_TIMES))
+    return list(times) + [float('nan')] * (MAX_TIMES - len(times))
+
+
+def to_records(results):
+    """Convert BenchmarkResult objects to a structured array."""
+    return np.array([
+        (result.function, result.element_count, result.distribution,
+         result.pick, result.result.loops, result.result.repetitions,
+         result.result.time, _padded_times(result.result.times),
+         *stats.summarize(result.result.times),
+         *(result.memory or [float('nan')] * len(MEMORY_FIELDS)))
+        for result in results
+    ], dtype=RESULT_DTYPE)
+
+
+def to_benchmark_results(records):
+    """Convert a structured array to a list of BenchmarkResult objects."""
+    from benchmark import BenchmarkResult, TimeitResult
+    timings = records[TIMING_FIELDS].tolist()
+    usages = records[MEMORY_FIELDS].tolist()
+    return [
+        BenchmarkResult(
+            function, element_count,
+            TimeitResult(loops, repetitions, time,
+                         tuple(times[~np.isnan(times)].tolist())),
+            distribution, pick, _memory_result(usage)
+        )
+        for (function, element_count, distribution, pick, loops, repetitions,
+             time, times), usage in zip(timings, usages)
+    ]
+
+
+def _memory_result(usage):
+    """Convert memory columns to a MemoryResult, or None if not profiled."""
+    if np.isnan(usage).any():
+        return None
+    return memory.MemoryResult(*map(int, usage))
+
+
+class ResultWriter:
+    """Append benchmark results to a new results file, flushing each record
+    so that an interrupted run keeps everything measured so far."""
+
+    def __init__(self, path, metadata=None):
+        self.path = path
+        self._file = open(path, 'xb')
+        self._file.write(MAGIC)
+        self._file.write(json.dumps(metadata or {}).encode() + b'\n')
+        self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, result):
+        """Append a single BenchmarkResult."""
+        self._file.write(to_records([result]).tobytes())
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _as_tuple(timing):
+    """Turn the fields of a timing, and any list fields, into tuples."""
+    return tuple(
+        tuple(field) if isinstance(field, (list, tuple)) else field
+        for field in timing
+    )
+
+
+class ResultCache:
+    """Timings and memory profiles of earlier measurements by cache key.
+
+    The cache is read from `path` if it exists, and every new timing is
+    appended and flushed right away, so that an interrupted run resumes from
+    its last finished measurement. A partially written trailing line is
+    ignored. A timing of None marks a measurement that failed, so that it is
+    not retried until its key changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        complete = True
+        try:
+            with open(path) as f:
+                for line in f:
+                    complete = line.endswith('\n')
+                    try:
+                        key, timing, *memory = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._add(key, timing, *memory)
+        except FileNotFoundError:
+            pass
+        self._file = open(path, 'a')
+        if not complete:
+            self._file.write('\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _add(self, key, timing, memory=None):
+        if memory is not None:
+            memory = tuple(memory)
+        if timing is not None:
+            timing = _as_tuple(timing)
+        self.entries[key] = timing, memory
+
+    def get(self, key):
+        """Return (timing fields or None, memory profile fields or None)
+        stored for a key, or None."""
+        return self.entries.get(key)
+
+    def put(self, key, timing, memory=None):
+        """Store the fields of a timing, e.g. a TimeitResult, and optionally
+        of a memory profile, for a key."""
+        self._add(key, timing, memory)
+        self._file.write(json.dumps([key, *self.entries[key]]) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    """Unpickler for result lists pickled by benchmark.py run as a script,
+    where the result classes were recorded as members of __main__."""
+
+    def find_class(self, module, name):
+        if module == '__main__' and name in ('BenchmarkResult',
+                                             'TimeitResult'):
+            module = 'benchmark'
+        return super().find_class(module, name)
+
+
+def load(f):
+    """Load (metadata, records) from an open binary results file."""
+    if f.readline() != MAGIC:
+        f.seek(0)
+        return {}, to_records(_LegacyUnpickler(f).load())
+    metadata = json.loads(f.readline())
+    raw = f.read()
+    count = len(raw) // RESULT_DTYPE.itemsize
+    return metadata, np.frombuffer(raw, dtype=RESULT_DTYPE, count=count)
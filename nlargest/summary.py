@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Mergeable, serialisable summaries of the n largest numbers of a stream.
+
+A summary is the heap of a nlargest.TopN accumulator together with its pick
+size n, a description of the key the numbers were taken by (e.g.
+"latency_ms"), and the count of numbers seen. Producers, such as per-host
+agents, summarise their local streams and ship the summaries instead of the
+raw numbers, and the summaries of all producers merge into the summary of the
+union of their streams. Merging is associative and commutative, so summaries
+can be combined in any grouping and order.
+
+A summary file starts with a magic line and a line of JSON metadata, followed
+by the retained numbers in ascending order, which is also a valid heap, as a
+little-endian array of signed 64-bit integers or doubles. Integers outside
+the 64-bit range, and mixtures of integers and floats, which an array would
+lose or convert, are written as a JSON list instead.
+"""
+import argparse
+import array
+import collections
+import functools
+import glob
+import json
+import numbers
+import os
+import sys
+
+import nlargest
+
+
+MAGIC = b'NLARGEST-SUMMARY 1\n'
+
+
+# Array typecodes of the encoded numbers, which are little-endian on disk,
+# and the typecode of numbers encoded as JSON.
+INT_TYPECODE = 'q'
+FLOAT_TYPECODE = 'd'
+JSON_TYPECODE = 'json'
+
+
+# Bounds of the signed 64-bit integers of INT_TYPECODE.
+INT_MIN, INT_MAX = -2**63, 2**63 - 1
+
+
+# File name pattern of summary files merged by the CLI.
+PATTERN = '*.topn'
+
+
+class TopNSummary:
+    """Summary of the n largest numbers of a stream, by a described key."""
+    __slots__ = ('top', 'key', 'count')
+
+    def __init__(self, n, iterable=(), key=None):
+        self.top = nlargest.TopN(n)
+        self.key = key
+        self.count = 0
+        self.extend(iterable)
+
+    def __repr__(self):
+        return '{}({}, key={!r}, count={})'.format(
+            type(self).__name__, self.n, self.key, self.count
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, TopNSummary):
+            return NotImplemented
+        return ((self.n, self.key, self.count, self.result())
+                == (other.n, other.key, other.count, other.result()))
+
+    @property
+    def n(self):
+        return self.top.n
+
+    def extend(self, iterable):
+        """Add all numbers from an iterable."""
+        try:
+            count = len(iterable)
+        except TypeError:
+            counter = _Counter(iterable)
+            self.top.extend(counter)
+            # TopN.extend stops early for n = 0, but every number is seen.
+            collections.deque(counter, 0)
+            count = counter.count
+        else:
+            self.top.extend(iterable)
+        self.count += count
+
+    def merge(self, other):
+        """Return the summary of the union of the streams of this and another
+        summary of the same key. Its pick size is the smaller of the two,
+        the largest for which the merged numbers are exact."""
+        if self.key != other.key:
+            raise ValueError('cannot merge summaries by key {!r} and {!r}'
+                             .format(self.key, other.key))
+        merged = TopNSummary(min(self.n, other.n), key=self.key)
+        merged.top.extend(self.top.result()[-merged.n:])
+        merged.top.merge(other.top)
+        merged.count = self.count + other.count
+        return merged
+
+    def result(self):
+        """Return the retained numbers in ascending order."""
+        return self.top.result()
+
+    def to_bytes(self):
+        """Encode the summary in the summary file format."""
+        items = self.result()
+        typecode = _typecode(items)
+        if typecode == JSON_TYPECODE:
+            raw = json.dumps(_json_numbers(items)).encode()
+        else:
+            values = array.array(typecode, items)
+            if sys.byteorder == 'big':
+                values.byteswap()
+            raw = values.tobytes()
+        metadata = {'n': self.n, 'key': self.key, 'count': self.count,
+                    'typecode': typecode}
+        return MAGIC + json.dumps(metadata).encode() + b'\n' + raw
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Decode a summary from the summary file format."""
+        if not data.startswith(MAGIC):
+            raise ValueError('not a top-n summary')
+        header, _, raw = data[len(MAGIC):].partition(b'\n')
+        metadata = json.loads(header)
+        if metadata['typecode'] == JSON_TYPECODE:
+            items = json.loads(raw)
+        else:
+            values = array.array(metadata['typecode'])
+            values.frombytes(raw)
+            if sys.byteorder == 'big':
+                values.byteswap()
+            items = values.tolist()
+        summary = cls(metadata['n'], items, key=metadata['key'])
+        summary.count = metadata['count']
+        return summary
+
+    def dump(self, f):
+        """Write the summary to an open binary file."""
+        f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, f):
+        """Read a summary from an open binary file."""
+        return cls.from_bytes(f.read())
+
+
+def _typecode(items):
+    """Return the typecode encoding the given numbers without loss."""
+    integral = [isinstance(i, numbers.Integral) for i in items]
+    if all(integral):
+        if all(INT_MIN <= i <= INT_MAX for i in items):
+            return INT_TYPECODE
+        return JSON_TYPECODE
+    for i, is_integral in zip(items, integral):
+        if not is_integral and not isinstance(i, float):
+            raise TypeError('summaries hold integers and floats, not {}'
+                            .format(type(i).__name__))
+    return FLOAT_TYPECODE if not any(integral) else JSON_TYPECODE
+
+
+def _json_numbers(items):
+    """Convert numbers, e.g. NumPy scalars, to the int and float objects
+    JSON encodes."""
+    return [int(i) if isinstance(i, numbers.Integral) else float(i)
+            for i in items]
+
+
+class _Counter:
+    """Iterator counting the items it passes on."""
+    __slots__ = ('_iterator', 'count')
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self._iterator)
+        self.count += 1
+        return item
+
+
+def merge(summaries):
+    """Merge summaries, e.g. of many producers, into one."""
+    return functools.reduce(TopNSummary.merge, summaries)
+
+
+def load_directory(directory, pattern=PATTERN):
+    """Load all summary files matching a pattern in a directory."""
+    summaries = []
+    for path in sorted(glob.glob(os.path.join(directory, pattern))):
+        with open(path, 'rb') as f:
+            summaries.append(TopNSummary.load(f))
+    return summaries
+
+
+def parse_cli_arguments(args):
+    """Define CLI and parse arguments accordingly."""
+    argparser = argparse.ArgumentParser(
+        description='Merge the top-n summary files in a directory.'
+    )
+    argparser.add_argument('directory', metavar='DIR',
+                           help='directory of summary files')
+    argparser.add_argument('--pattern', default=PATTERN,
+                           help='file name pattern of summary files '
+                                '[default: {}]'.format(PATTERN))
+    argparser.add_argument('-o', '--output', metavar='FILE',
+                           help='write the merged summary to FILE')
+    return argparser.parse_args(args)
+
+
+def main(cli_args):
+    args = parse_cli_arguments(cli_args)
+
+    summaries = load_directory(args.directory, args.pattern)
+    if not summaries:
+        sys.exit('No summary files matching {} in {}'.format(
+            args.pattern, args.directory
+        ))
+    merged = merge(summaries)
+
+    if args.output:
+        with open(args.output, 'wb') as f:
+            merged.dump(f)
+        print('Merged {} summaries → {}'.format(len(summaries), args.output))
+    print(merged)
+    print(' '.join(map(str, merged.result())))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -2,10 +2,14 @@
 import contextlib
 import datetime
 import io
+import os
 import sys
+import tempfile
 import unittest
+from unittest import mock
 
 import benchmark as bench
+import store
 
 
 @contextlib.contextmanager
@@ -36,6 +40,15 @@ class TestTimeitCommand(unittest.TestCase):
         ]
         self.assertEqual(expected, bench.timeit_command(setup, function))
 
+    def test_repeat(self):
+        expected = [
+            'python3', '-m', 'timeit', '-v', '-v', '-r', '20',
+            '-s', 'setup', 'function call'
+        ]
+        self.assertEqual(
+            expected, bench.timeit_command(['setup'], 'function call', 20)
+        )
+
     def test_no_setup(self):
         setup = None
         function = 'function call'
@@ -58,6 +71,7 @@ class TestTimeitOutputToFloat(unittest.TestCase):
             (('2.54', 'usec'), 2.54e-6),
             (('2.54', 'msec'), 2.54e-3),
             (('2.54', 'sec'), 2.54),
+            (('2.54', 'nsec'), 2.54e-9),
         ]
         for (time, time_unit), value in mapping:
             with self.subTest():
@@ -92,6 +106,312 @@ class TestParseTimeitOutput(unittest.TestCase):
             with self.subTest():
                 self.assertEqual(result, bench.parse_timeit_output(output))
 
+    def test_verbose(self):
+        output = (
+            '1 loop -> 3.11e-06 secs\n'
+            '1000 loops -> 0.25 secs\n'
+            '\n'
+            'raw times: 250.0 msec, 300.0 msec, 2.0 sec\n'
+            '\n'
+            '1000 loops, best of 3: 250.0 usec per loop\n'
+        )
+        self.assertEqual(
+            bench.TimeitResult(1000, 3, 2.5e-4, (2.5e-4, 3e-4, 2e-3)),
+            bench.parse_timeit_output(output)
+        )
+
+
+class TestTimeitInProcess(unittest.TestCase):
+    def test_result(self):
+        result = bench.timeit_in_process('x + 1', {'x': 1}, repeat=2)
+        self.assertIsInstance(result, bench.TimeitResult)
+        self.assertGreaterEqual(result.loops, 1)
+        self.assertEqual(2, result.repetitions)
+        self.assertGreater(result.time, 0)
+        self.assertEqual(2, len(result.times))
+        self.assertEqual(result.time, min(result.times))
+
+
+class TestMeasure(unittest.TestCase):
+    sampling = bench.Sampling(repeat=5, noise=0.05, reruns=2)
+    noisy = bench.TimeitResult(1, 5, 0.5, (1.0, 1.5, 1.2, 0.5, 0.8))
+    less_noisy = bench.TimeitResult(1, 5, 0.9, (1.0, 1.1, 0.95, 0.9, 1.05))
+    quiet = bench.TimeitResult(1, 5, 1.0, (1.0, 1.01, 1.0, 1.0, 1.0))
+
+    def timer(self, *results):
+        return mock.Mock(side_effect=results)
+
+    def test_default(self):
+        timer = self.timer(self.noisy)
+        self.assertEqual(self.noisy, bench.measure(timer))
+        timer.assert_called_once_with()
+
+    def test_quiet(self):
+        timer = self.timer(self.quiet)
+        self.assertEqual(self.quiet, bench.measure(timer, self.sampling))
+        timer.assert_called_once_with(repeat=5)
+
+    def test_rerun(self):
+        timer = self.timer(self.noisy, self.quiet)
+        with self.assertLogs(level='INFO'):
+            result = bench.measure(timer, self.sampling)
+        self.assertEqual(self.quiet, result)
+        self.assertEqual(2, timer.call_count)
+
+    def test_stays_noisy(self):
+        timer = self.timer(self.noisy, self.less_noisy, self.noisy)
+        with self.assertLogs(level='WARNING'):
+            result = bench.measure(timer, self.sampling)
+        self.assertEqual(self.less_noisy, result)
+        self.assertEqual(3, timer.call_count)
+
+
+class TestBenchmarkInProcess(unittest.TestCase):
+    def test_input_built_once_per_element_count(self):
+        inputs = []
+
+        def fake_timeit(statement, namespace):
+            inputs.append(namespace['data'])
+            return bench.TimeitResult(1, 1, len(namespace['data']))
+
+        cells = bench.sweep_cells(['len', 'sum'], [1, 10], ['random'], [1])
+        with mock.patch.object(bench, 'timeit_in_process', fake_timeit):
+            results = bench.benchmark_in_process(
+                ['import random'], 'data = [0] * {element_count}',
+                '{function}(data)', cells, 10
+            )
+        self.assertEqual(
+            [('len', 1), ('len', 10), ('sum', 1), ('sum', 10)],
+            [(r.function, r.element_count) for r in results]
+        )
+        self.assertIs(inputs[0], inputs[1])
+        self.assertIs(inputs[2], inputs[3])
+        self.assertIsNot(inputs[0], inputs[2])
+
+    def test_skip_failing_cell(self):
+        cells = bench.sweep_cells(['len', 'float'], [1], ['random'], [1])
+        with mock.patch.object(bench, 'timeit_in_process', eval), \
+                self.assertLogs(level='WARNING'):
+            results = bench.benchmark_in_process(
+                [], 'data = [0] * {element_count}', '{function}(data)',
+                cells, 1
+            )
+        self.assertEqual(['len'], [r.function for r in results])
+
+    def test_memory(self):
+        cells = bench.sweep_cells(['list'], [10, 100000], ['random'], [1])
+        with mock.patch.object(bench, 'timeit_in_process',
+                               lambda call, namespace: None):
+            results = bench.benchmark_in_process(
+                [], 'data = [0] * {element_count}', '{function}(data)',
+                cells, 100000, memory=True
+            )
+        small, large = (result.memory for result in results)
+        self.assertGreater(large.peak, 8 * 100000)
+        self.assertLess(small.peak, large.peak)
+
+
+class TestSweepCells(unittest.TestCase):
+    def test_order(self):
+        cells = bench.sweep_cells(['f', 'g'], [10, 20],
+                                  ['random', 'ascending'])
+        self.assertEqual(8, len(cells))
+        self.assertEqual(bench.Cell('f', 10, 'random', 5), cells[0])
+        self.assertEqual(bench.Cell('f', 20, 'random', 5), cells[1])
+        self.assertEqual(bench.Cell('g', 10, 'random', 5), cells[2])
+        self.assertEqual(bench.Cell('f', 10, 'ascending', 5), cells[4])
+
+    def test_picks(self):
+        cells = bench.sweep_cells(['f'], [10, 100], ['random'], [1, 50])
+        self.assertEqual([(10, 1), (100, 1), (100, 50)],
+                         [(cell.element_count, cell.pick) for cell in cells])
+
+    def test_interpolation(self):
+        cell = bench.Cell('f', 10, 'ascending', 3)
+        element_setup, call = bench.cell_statements(
+            'x = {distribution}({element_count}, {max_element_count})',
+            'g({function}, {pick})', cell, 100
+        )
+        self.assertEqual('x = ascending(10, 100)', element_setup)
+        self.assertEqual('g(f, 3)', call)
+
+    def test_result_defaults(self):
+        result = bench.BenchmarkResult('f', 10, None)
+        self.assertEqual(bench.DEFAULT_DISTRIBUTION, result.distribution)
+        self.assertEqual(bench.DEFAULT_PICK, result.pick)
+
+
+class TestParallelScheduling(unittest.TestCase):
+    def test_largest_first(self):
+        cells = bench.sweep_cells(['a', 'b'], [10, 1000], ['random'])
+        self.assertEqual(
+            [('a', 1000), ('b', 1000), ('a', 10), ('b', 10)],
+            [cell[:2] for cell in bench.largest_first(cells)]
+        )
+
+    def test_available_cpus(self):
+        cpus = bench.available_cpus()
+        self.assertTrue(cpus)
+        self.assertTrue(all(isinstance(cpu, int) for cpu in cpus))
+
+    def test_result_order(self):
+        cells = bench.sweep_cells(['len'], [1, 10], ['random'], [1])
+        results = bench.benchmark_parallel(
+            2, [], 'data = [0] * {element_count}', '{function}(data)',
+            cells, 10, in_process=True
+        )
+        self.assertEqual(
+            [('len', 1), ('len', 10)],
+            [(r.function, r.element_count) for r in results]
+        )
+
+
+class TestResultCache(unittest.TestCase):
+    config = bench.BenchmarkConfiguration(
+        [1.0], 'nlargest', 'nlargest_', ['import nlargest'],
+        'data = list(range({element_count}))', 'nlargest.{function}(data)',
+        ['random'], [5]
+    )
+
+    def test_key_changes(self):
+        cell = bench.Cell('f', 10, 'random', 5)
+        fingerprint = bench.sweep_fingerprint(self.config, 10)
+        key = bench.cell_key(cell, 'def f(): pass', fingerprint)
+        self.assertEqual(key, bench.cell_key(cell, 'def f(): pass',
+                                             fingerprint))
+        changed = [
+            bench.cell_key(cell, 'def f(): return', fingerprint),
+            bench.cell_key(cell._replace(element_count=100), 'def f(): pass',
+                           fingerprint),
+            bench.cell_key(cell._replace(distribution='zipf'),
+                           'def f(): pass', fingerprint),
+            bench.cell_key(cell._replace(pick=1), 'def f(): pass',
+                           fingerprint),
+            bench.cell_key(cell, 'def f(): pass',
+                           bench.sweep_fingerprint(self.config, 10, True)),
+        ]
+        self.assertNotIn(key, changed)
+
+    def test_function_sources(self):
+        sources = bench.function_sources(bench, ['cell_key'])
+        self.assertTrue(sources['cell_key'].startswith('def cell_key('))
+
+    def test_split_cached(self):
+        cells = bench.sweep_cells(['a', 'b', 'c'], [10], ['random'])
+        keys = {cell: cell.function for cell in cells}
+        with tempfile.TemporaryDirectory() as directory:
+            with store.ResultCache(os.path.join(directory, 'cache')) as cache:
+                cache.put('b', bench.TimeitResult(10, 5, 0.5))
+                cache.put('c', None)
+                with self.assertLogs(level='WARNING'):
+                    cached, missing = bench.split_cached(cells, keys, cache)
+        self.assertEqual(cells[:1], missing)
+        self.assertEqual(
+            [bench.BenchmarkResult('b', 10, bench.TimeitResult(10, 5, 0.5))],
+            cached
+        )
+
+    def test_cache_skipped(self):
+        cells = bench.sweep_cells(['a', 'b'], [10], ['random'])
+        keys = {cell: cell.function for cell in cells}
+        timing = bench.TimeitResult(10, 5, 0.5)
+        results = [bench.BenchmarkResult('b', 10, timing)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache')
+            with store.ResultCache(path) as cache:
+                bench.cache_skipped(cells, results, keys, cache)
+            with store.ResultCache(path) as cache:
+                self.assertEqual((None, None), cache.get('a'))
+                self.assertNotIn('b', cache)
+
+
+def comparison_result(function, time, times=()):
+    timing = bench.TimeitResult(1, len(times), time, times)
+    return bench.BenchmarkResult(function, 10, timing)
+
+
+class TestCompare(unittest.TestCase):
+    base = [
+        comparison_result('same', 1.0, (1.0, 1.1, 0.9, 1.0, 1.05)),
+        comparison_result('slower', 1.0, (1.0, 1.01, 0.99, 1.0, 1.0)),
+        comparison_result('faster', 1.0),
+        comparison_result('removed', 1.0),
+    ]
+    new = [
+        comparison_result('added', 1.0),
+        comparison_result('faster', 0.5),
+        comparison_result('slower', 1.2, (1.2, 1.21, 1.19, 1.2, 1.2)),
+        comparison_result('same', 1.0, (1.1, 1.0, 0.9, 1.0, 0.95)),
+    ]
+
+    def comparisons(self):
+        return bench.compare_records(store.to_records(self.base),
+                                     store.to_records(self.new))
+
+    def test_match_cells(self):
+        comparisons = self.comparisons()
+        self.assertEqual(['same', 'slower', 'faster'],
+                         [c.cell.function for c in comparisons])
+        self.assertEqual([1.0, 1.2, 0.5], [c.ratio for c in comparisons])
+
+    def test_significance(self):
+        same, slower, faster = self.comparisons()
+        self.assertFalse(bench.is_significant(same))
+        self.assertTrue(bench.is_significant(slower))
+        self.assertTrue(bench.is_significant(faster))
+        self.assertLessEqual(slower.ci_low, 1.2)
+        self.assertGreater(slower.ci_low, 1)
+
+    def test_regression(self):
+        same, slower, faster = self.comparisons()
+        self.assertTrue(bench.is_regression(slower))
+        self.assertFalse(bench.is_regression(slower, threshold=0.3))
+        self.assertFalse(bench.is_regression(same))
+        self.assertFalse(bench.is_regression(faster))
+
+    def test_common_statistic(self):
+        same, slower, faster = self.comparisons()
+        self.assertEqual(['median', 'median', 'best'],
+                         [same.statistic, slower.statistic, faster.statistic])
+        # A run with repetition times against one without compares best
+        # times, not a median against a best time.
+        base = [comparison_result('f', 1.0, (1.0, 1.5, 1.6, 1.7, 1.8))]
+        new = [comparison_result('f', 1.2)]
+        comparison, = bench.compare_records(store.to_records(base),
+                                            store.to_records(new))
+        self.assertEqual('best', comparison.statistic)
+        self.assertAlmostEqual(1.2, comparison.ratio)
+
+    def test_table(self):
+        rows = bench.comparison_rows(self.comparisons())
+        self.assertEqual(['Verdict', 'noise', 'REGRESSION', 'faster'],
+                         [row[-1] for row in rows])
+        markdown = bench.format_table(rows, markdown=True).splitlines()
+        self.assertEqual(len(rows) + 1, len(markdown))
+        self.assertTrue(markdown[1].startswith('|---'))
+        self.assertIn('-50.0%', bench.format_table(rows))
+
+    def test_exit_status(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for name, results in ('base', self.base), ('new', self.new):
+                paths.append(os.path.join(directory, name))
+                with store.ResultWriter(paths[-1]) as writer:
+                    for result in results:
+                        writer.append(result)
+            markdown = os.path.join(directory, 'table.md')
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                self.assertEqual(1, bench.compare(
+                    paths + ['--markdown', markdown]
+                ))
+                self.assertEqual(0, bench.compare(
+                    paths + ['--threshold', '0.5']
+                ))
+            self.assertIn('Regressions beyond 5.0%: slower',
+                          output.getvalue())
+            with open(markdown) as f:
+                self.assertIn('| slower ', f.read())
+
 
 class TestGetFunctionNames(unittest.TestCase):
     def test_known_object_attr(self):
@@ -131,6 +451,45 @@ class TestCLI(unittest.TestCase):
         args = bench.parse_cli_arguments(['--save', self.file])
         self.assertTrue(args.save)
 
+    def test_in_process(self):
+        args = bench.parse_cli_arguments([self.file])
+        self.assertFalse(args.in_process)
+        args = bench.parse_cli_arguments(['--in-process', self.file])
+        self.assertTrue(args.in_process)
+
+    def test_jobs(self):
+        args = bench.parse_cli_arguments([self.file])
+        self.assertEqual(1, args.jobs)
+        args = bench.parse_cli_arguments(['--jobs', '4', self.file])
+        self.assertEqual(4, args.jobs)
+
+    def test_stats(self):
+        args = bench.parse_cli_arguments([self.file])
+        self.assertFalse(args.stats)
+        self.assertEqual(bench.STATS_REPEAT, args.repeat)
+        args = bench.parse_cli_arguments(
+            ['--stats', '--repeat', '7', '--noise', '0.1', '--reruns', '0',
+             self.file]
+        )
+        self.assertEqual((True, 7, 0.1, 0),
+                         (args.stats, args.repeat, args.noise, args.reruns))
+        with silence_stderr(), self.assertRaises(SystemExit):
+            bench.parse_cli_arguments(['--repeat', '1', self.file])
+
+    def test_memory(self):
+        args = bench.parse_cli_arguments([self.file])
+        self.assertFalse(args.memory)
+        args = bench.parse_cli_arguments(['--memory', self.file])
+        self.assertTrue(args.memory)
+
+    def test_cache(self):
+        args = bench.parse_cli_arguments([self.file])
+        self.assertIsNone(args.cache)
+        args = bench.parse_cli_arguments([self.file, '--cache'])
+        self.assertEqual(bench.CACHE_FILE, args.cache)
+        args = bench.parse_cli_arguments(['--cache', 'c', self.file])
+        self.assertEqual('c', args.cache)
+
     def test_debug_argument(self):
         args = bench.parse_cli_arguments([self.file])
         self.assertFalse(args.debug)
@@ -163,8 +522,27 @@ class TestConfigParser(unittest.TestCase):
 
     def setUp(self):
         self.powers, self.module_name, self.prefix, self.setup, \
-            self.format_element, self.format_call = \
-            bench.parse_benchmark_configuration(self.mock_config())
+            self.format_element, self.format_call, self.distributions, \
+            self.picks = bench.parse_benchmark_configuration(
+                self.mock_config()
+            )
+
+    def test_default_picks(self):
+        self.assertEqual([bench.DEFAULT_PICK], self.picks)
+
+    def test_picks(self):
+        self.config_lines = dict(self.config_lines, pick='1 5 50')
+        config = bench.parse_benchmark_configuration(self.mock_config())
+        self.assertEqual([1, 5, 50], config.picks)
+
+    def test_default_distributions(self):
+        self.assertEqual([bench.DEFAULT_DISTRIBUTION], self.distributions)
+
+    def test_distributions(self):
+        self.config_lines = dict(self.config_lines,
+                                 distributions='random  ascending')
+        config = bench.parse_benchmark_configuration(self.mock_config())
+        self.assertEqual(['random', 'ascending'], config.distributions)
 
     def test_powers(self):
         expected = list(map(float, self.config_lines['powers'].split()))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+import io
+import statistics
+import unittest
+
+from benchmark import BenchmarkResult, TimeitResult
+import calibrate
+import nlargest
+
+
+def result(function, element_count, time, pick=5):
+    return BenchmarkResult(function, element_count, TimeitResult(1, 3, time),
+                           'random', pick)
+
+
+class TestCrossover(unittest.TestCase):
+    def test_settled_crossover(self):
+        slow = {10: 1, 100: 2, 1000: 3, 10000: 4}
+        fast = {10: 0.5, 100: 3, 1000: 2, 10000: 3}
+        self.assertEqual(1000, calibrate.crossover_element_count(slow, fast))
+
+    def test_no_crossover(self):
+        slow = {10: 1, 100: 2}
+        fast = {10: 2, 100: 3}
+        self.assertIsNone(calibrate.crossover_element_count(slow, fast))
+
+
+class TestCalibrate(unittest.TestCase):
+    data = [
+        result('nlargest_ref_sorted', 10, 1),
+        result('nlargest_ref_sorted', 100, 10),
+        result('nlargest_list3', 10, 2),
+        result('nlargest_list3', 100, 3),
+        result('nlargest_heapreplace3', 10, 2),
+        result('nlargest_heapreplace3', 100, 4),
+    ]
+
+    def test_calibrate(self):
+        profile = calibrate.calibrate(
+            self.data, nlargest.Profile(sort_ratio=1, list_max_pick=1)
+        )
+        self.assertEqual(nlargest.Profile(sort_ratio=0.05, list_max_pick=5),
+                         profile)
+
+    def test_pick_crossover(self):
+        data = self.data + [
+            result('nlargest_ref_sorted', 100, 10, pick=50),
+            result('nlargest_list3', 100, 9, pick=50),
+            result('nlargest_heapreplace3', 100, 5, pick=50),
+        ]
+        profile = calibrate.calibrate(
+            data, nlargest.Profile(sort_ratio=1, list_max_pick=100)
+        )
+        self.assertEqual(5, profile.list_max_pick)
+        self.assertEqual(statistics.median([0.05, 0.5]), profile.sort_ratio)
+
+    def test_select_crossover(self):
+        data = self.data + [
+            result('nlargest_select', 10, 2),
+            result('nlargest_select', 100, 5),
+        ]
+        profile = calibrate.calibrate(data)
+        self.assertEqual(100, profile.select_min_count)
+        self.assertEqual(nlargest.DEFAULT_PROFILE.select_min_count,
+                         calibrate.calibrate(self.data).select_min_count)
+
+    def test_write_profile_roundtrip(self):
+        profile = nlargest.Profile(sort_ratio=0.25, list_max_pick=3)
+        file = io.StringIO()
+        calibrate.write_profile(profile, file)
+        self.assertIn('[Dispatch]', file.getvalue())
+        self.assertIn('sort_ratio = 0.25', file.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+import random
+import unittest
+
+import distributions
+
+
+class TestDistributions(unittest.TestCase):
+    def generate(self, name, element_count=100, max_element_count=1000):
+        random.seed(42)
+        return getattr(distributions, name)(element_count, max_element_count)
+
+    def test_lengths(self):
+        for name in distributions.NAMES:
+            with self.subTest(distribution=name):
+                self.assertEqual(100, len(self.generate(name)))
+
+    def test_reproducible(self):
+        for name in distributions.NAMES:
+            with self.subTest(distribution=name):
+                self.assertEqual(self.generate(name), self.generate(name))
+
+    def test_random_matches_original_setup(self):
+        random.seed(42)
+        expected = [random.randrange(1000) for _ in range(100)]
+        self.assertEqual(expected, self.generate('random'))
+
+    def test_ordering(self):
+        ascending = self.generate('ascending')
+        self.assertEqual(sorted(ascending), ascending)
+        descending = self.generate('descending')
+        self.assertEqual(sorted(descending, reverse=True), descending)
+
+    def test_duplicates(self):
+        self.assertLessEqual(len(set(self.generate('duplicates'))),
+                             distributions.DUPLICATE_VALUES)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+import os
+import random
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+import files
+import nlargest
+
+
+random.seed(42)
+numbers = [random.randrange(-10**6, 10**6) for i in range(1500)]
+
+
+class TestNlargestDir(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+        os.mkdir(os.path.join(self.path, 'sub'))
+        self.sizes = {
+            'a': 3, 'c': 1, 'e': 5, 'b': 2, os.path.join('sub', 'd'): 4,
+        }
+        for name, size in self.sizes.items():
+            with open(os.path.join(self.path, name), 'wb') as f:
+                f.write(size * b'x')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_name(self):
+        entries = files.nlargest_dir(2, self.path)
+        self.assertEqual(['c', 'e'], [entry.name for entry in entries])
+
+    def test_size(self):
+        entries = files.nlargest_dir(2, self.path, key='size')
+        self.assertEqual(['a', 'e'], [entry.name for entry in entries])
+
+    def test_recursive(self):
+        entries = files.nlargest_dir(2, self.path, key='size', recursive=True)
+        self.assertEqual(['d', 'e'], [entry.name for entry in entries])
+
+    def test_unreadable_subdirectory(self):
+        scandir = os.scandir
+
+        def failing_scandir(path):
+            if os.path.basename(path) == 'sub':
+                raise PermissionError(path)
+            return scandir(path)
+
+        with mock.patch.object(os, 'scandir', failing_scandir):
+            entries = files.nlargest_dir(2, self.path, key='size',
+                                         recursive=True)
+        self.assertEqual(['a', 'e'], [entry.name for entry in entries])
+
+    def test_short_directory(self):
+        entries = files.nlargest_dir(10, self.path, recursive=True)
+        self.assertEqual(['a', 'b', 'c', 'd', 'e'],
+                         [entry.name for entry in entries])
+
+    def test_empty_directory(self):
+        with tempfile.TemporaryDirectory() as path:
+            self.assertEqual([], files.nlargest_dir(2, path))
+
+    def test_unknown_key(self):
+        with self.assertRaises(KeyError):
+            files.nlargest_dir(2, self.path, key='owner')
+
+
+class TestNlargestMmap(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'data.bin')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, fmt, values, trailer=b''):
+        with open(self.path, 'wb') as f:
+            f.write(struct.pack('{}{}{}'.format(fmt[:-1], len(values),
+                                                fmt[-1]), *values))
+            f.write(trailer)
+
+    def verify(self, n, fmt, values):
+        itemsize = struct.calcsize(fmt)
+        pairs = [(value, i * itemsize) for i, value in enumerate(values)]
+        return sorted(sorted(pairs, key=lambda p: (p[0], -p[1]))[-n:])
+
+    def check(self, n, fmt, values, **kwargs):
+        expected = self.verify(n, fmt, values)
+        self.assertEqual(
+            expected, files.nlargest_mmap(n, self.path, fmt, **kwargs)
+        )
+        with mock.patch.object(nlargest, 'numpy', None):
+            self.assertEqual(
+                expected, files.nlargest_mmap(n, self.path, fmt, **kwargs)
+            )
+
+    def test_int64_windows(self):
+        self.write('<q', numbers, trailer=b'\x01\x02')
+        for window_size in (1, 4096, files.WINDOW_SIZE):
+            with self.subTest(window_size=window_size):
+                self.check(5, '<q', numbers, window_size=window_size)
+
+    def test_float32(self):
+        values = [struct.unpack('<f', struct.pack('<f', i / 7))[0]
+                  for i in numbers]
+        self.write('<f', values)
+        self.check(5, '<f', values, window_size=1)
+
+    def test_byte_orders(self):
+        for fmt in ('!q', '>i', '@d', 'h'):
+            values = [i % 30000 for i in numbers]
+            self.write(fmt, values)
+            with self.subTest(fmt=fmt):
+                self.check(5, fmt, values, window_size=1)
+
+    def test_ties(self):
+        values = [1, 1] + [7] * 8 + [3, 9, 7, 9]
+        self.write('<q', values)
+        self.assertEqual([(7, 16), (7, 24)],
+                         self.verify(2, '<q', values[:10]))
+        for n in (2, 5):
+            for window_size in (1, files.WINDOW_SIZE):
+                with self.subTest(n=n, window_size=window_size):
+                    self.check(n, '<q', values, window_size=window_size)
+
+    def test_short_file(self):
+        self.write('<q', numbers[:3])
+        self.check(5, '<q', numbers[:3])
+
+    def test_empty_file(self):
+        self.write('<q', [])
+        self.assertEqual([], files.nlargest_mmap(5, self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import collections
+import random
+import unittest
+
+import frequent
+
+
+random.seed(42)
+# Skewed stream: item i occurs about 1/i as often as item 1.
+stream = random.choices(range(1, 5001),
+                        weights=[1 / i for i in range(1, 5001)], k=50000)
+true_counts = collections.Counter(stream)
+
+
+class TestSpaceSaving(unittest.TestCase):
+    def test_bounded_memory(self):
+        for capacity in (1, 10, 100):
+            with self.subTest(capacity=capacity):
+                summary = frequent.SpaceSaving(capacity, stream)
+                self.assertLessEqual(len(summary), capacity)
+                self.assertEqual(len(stream), summary.total)
+
+    def test_error_bounds(self):
+        for chunk_size in (1, 1000):
+            summary = frequent.SpaceSaving(100, stream, chunk_size)
+            with self.subTest(chunk_size=chunk_size):
+                self.assertLessEqual(summary.max_error,
+                                     len(stream) / summary.capacity)
+                for hitter in summary.hitters():
+                    self.assertLessEqual(hitter.count - hitter.error,
+                                         true_counts[hitter.item])
+                    self.assertLessEqual(true_counts[hitter.item],
+                                         hitter.count)
+                for item, count in true_counts.items():
+                    if item not in summary:
+                        self.assertLessEqual(count, summary.max_error)
+
+    def test_top(self):
+        summary = frequent.SpaceSaving(200, stream)
+        top = summary.top(5)
+        self.assertTrue(summary.is_exact(5))
+        self.assertEqual(
+            sorted(item for item, count in true_counts.most_common(5)),
+            sorted(hitter.item for hitter in top)
+        )
+        self.assertEqual(sorted(hitter.count for hitter in top),
+                         [hitter.count for hitter in top])
+
+    def test_exact_without_evictions(self):
+        summary = frequent.SpaceSaving(10, 'abracadabrab')
+        self.assertEqual(0, summary.max_error)
+        self.assertTrue(summary.is_exact(2))
+        self.assertEqual([('b', 3, 0), ('a', 5, 0)], summary.top(2))
+        self.assertEqual(('z', 0, 0), summary.estimate('z'))
+
+    def test_inexact(self):
+        summary = frequent.SpaceSaving(2, 'abcdefabcdef')
+        self.assertFalse(summary.is_exact(1))
+
+    def test_add(self):
+        summary = frequent.SpaceSaving(2)
+        for item, weight in (('a', 3), ('b', 1), ('c', 1)):
+            summary.add(item, weight)
+        self.assertEqual(('c', 2, 1), summary.estimate('c'))
+        self.assertNotIn('b', summary)
+        self.assertEqual(5, summary.total)
+
+    def test_capacity(self):
+        with self.assertRaises(ValueError):
+            frequent.SpaceSaving(0)
+
+
+class TestHeavyHitters(unittest.TestCase):
+    def test_heavy_hitters(self):
+        top = frequent.heavy_hitters(3, iter(stream))
+        self.assertEqual([item for item, count in true_counts.most_common(3)],
+                         [hitter.item for hitter in reversed(top)])
+
+    def test_exact_top(self):
+        summary = frequent.SpaceSaving(100, stream)
+        exact = frequent.exact_top(10, [h.item for h in summary.hitters()],
+                                   stream)
+        self.assertEqual(
+            sorted(true_counts.most_common(10), key=lambda x: x[1]), exact
+        )
+
+    def test_exact_top_without_candidates(self):
+        self.assertEqual([], frequent.exact_top(5, [], stream))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import random
+import unittest
+
+import instrument
+import nlargest
+
+
+random.seed(0)
+unsorted = [random.random() for _ in range(1000)]
+inputs = {
+    'random': unsorted,
+    'ascending': sorted(unsorted),
+    'descending': sorted(unsorted, reverse=True),
+}
+
+
+class TestInstrument(unittest.TestCase):
+    def test_results(self):
+        for name in instrument.KERNELS:
+            kernel = getattr(nlargest, name)
+            counted = instrument.instrument(kernel)
+            for distribution, data in inputs.items():
+                with self.subTest(kernel=name, distribution=distribution):
+                    self.assertEqual(kernel(5, data), counted(5, data))
+
+    def test_key(self):
+        words = ['{:x}'.format(int(i * 1e6)) for i in unsorted]
+        for name in instrument.KERNELS:
+            if 'heappushpop' in name:
+                continue
+            with self.subTest(kernel=name):
+                self.assertEqual(
+                    getattr(nlargest, name)(5, words, key=len),
+                    instrument.instrument(name)(5, words, key=len)
+                )
+
+    def test_counts(self):
+        for name in instrument.KERNELS:
+            stats = instrument.KernelStats()
+            instrument.instrument(name, stats)(5, unsorted)
+            with self.subTest(kernel=name):
+                self.assertEqual(len(unsorted), stats.items)
+                head = 0 if name[-1].isalpha() else 5
+                self.assertEqual(len(unsorted) - head,
+                                 stats.rejections + stats.replacements)
+                self.assertGreaterEqual(stats.comparisons,
+                                        stats.rejections + stats.replacements)
+                self.assertLessEqual(stats.max_sift_depth, 2)
+
+    def test_distributions(self):
+        ascending = instrument.KernelStats()
+        descending = instrument.KernelStats()
+        kernel = 'nlargest_heapreplace3'
+        instrument.instrument(kernel, ascending)(5, inputs['ascending'])
+        instrument.instrument(kernel, descending)(5, inputs['descending'])
+        self.assertEqual(0, ascending.rejections)
+        self.assertEqual(0.0, ascending.rejection_rate)
+        self.assertEqual(0, descending.replacements)
+        self.assertEqual(1.0, descending.rejection_rate)
+
+    def test_heappushpop_calls(self):
+        pushpop = instrument.KernelStats()
+        replace = instrument.KernelStats()
+        instrument.instrument('nlargest_heappushpop3', pushpop)(5, unsorted)
+        instrument.instrument('nlargest_heapreplace3', replace)(5, unsorted)
+        self.assertEqual(len(unsorted) - 5, pushpop.calls)
+        self.assertEqual(replace.replacements, replace.calls)
+        self.assertEqual(replace.comparisons, pushpop.comparisons)
+
+    def test_variants_2_and_3(self):
+        operations = instrument.count_operations(
+            5, unsorted, ['nlargest_list2', 'nlargest_list3']
+        )
+        self.assertEqual(operations['nlargest_list2'].as_dict(),
+                         operations['nlargest_list3'].as_dict())
+
+    def test_callback(self):
+        calls = []
+        stats = instrument.KernelStats()
+        counted = instrument.instrument(nlargest.nlargest_list3, stats,
+                                        calls.append)
+        counted(5, unsorted)
+        counted(5, unsorted)
+        self.assertEqual(2, len(calls))
+        self.assertEqual(2 * len(unsorted), stats.items)
+        self.assertEqual(len(unsorted), calls[0].items)
+        self.assertEqual('nlargest_list3', counted.__name__)
+
+    def test_unknown_kernel(self):
+        with self.assertRaises(ValueError):
+            instrument.instrument(nlargest.nlargest_ref_sorted)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+import unittest
+
+import memory
+
+
+class TestProfileInProcess(unittest.TestCase):
+    def test_peak(self):
+        small = memory.profile_in_process('[0] * 10', {})
+        large = memory.profile_in_process('[0] * 100000', {})
+        self.assertGreater(large.peak, 8 * 100000)
+        self.assertLess(small.peak, large.peak)
+
+    def test_temporary(self):
+        usage = memory.profile_in_process('len([0] * 100000)', {})
+        self.assertGreater(usage.peak, 8 * 100000)
+        self.assertLess(usage.blocks, 10)
+
+    def test_retained_blocks(self):
+        usage = memory.profile_in_process(
+            '[object() for _ in range(1000)]', {}
+        )
+        self.assertGreaterEqual(usage.blocks, 1000)
+
+    def test_statement(self):
+        namespace = {}
+        usage = memory.profile_in_process('x = [0] * 1000', namespace)
+        self.assertIsInstance(usage, memory.MemoryResult)
+        self.assertEqual(1000, len(namespace['x']))
+
+    def test_max_rss(self):
+        self.assertGreaterEqual(memory.max_rss(), 0)
+
+
+class TestProfileSubprocess(unittest.TestCase):
+    def test_command(self):
+        command = memory.profile_command(['x = 1', 'y = 2'], 'x + y')
+        self.assertEqual(['python3', '-c'], command[:2])
+        self.assertIn("exec('x = 1\\ny = 2', namespace)", command[2])
+
+    def test_result(self):
+        usage = memory.profile_subprocess(['n = 100000'], '[0] * n')
+        self.assertGreater(usage.peak, 8 * 100000)
+
+
+if __name__ == '__main__':
+    unittest.main()
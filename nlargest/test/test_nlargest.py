@@ -1,7 +1,16 @@
 #!/usr/bin/env python3
+import array
+import asyncio
+import concurrent.futures
+import functools
 import heapq
+import inspect
+import os
+import pickle
 import random
+import tempfile
 import unittest
+from unittest import mock
 
 import nlargest
 
@@ -26,5 +35,493 @@ class TestSequence(unittest.TestCase):
                 self.assertEqual(f(N, unsorted), verify)
 
 
+class TestKey(unittest.TestCase):
+    functions = [
+        getattr(nlargest, fun)
+        for fun in dir(nlargest)
+        if fun.startswith('nlargest_')
+        and 'key' in inspect.signature(getattr(nlargest, fun)).parameters
+        and 'heappushpop' not in fun
+    ]
+    records = [{'id': i, 'value': -value} for i, value in enumerate(unsorted)]
+
+    @staticmethod
+    def key(record):
+        return record['value'], record['id']
+
+    def test_get_largest_by_key(self):
+        N = 5
+        verify = heapq.nlargest(N, self.records, key=self.key)[::-1]
+        for f in self.functions:
+            with self.subTest(function=f.__name__):
+                self.assertEqual(verify, f(N, self.records, key=self.key))
+
+    def test_tied_keys(self):
+        records = [(i % 3, i) for i in range(30)]
+        for f in self.functions:
+            for n in (1, 5, 12, 30):
+                with self.subTest(function=f.__name__, n=n):
+                    verify = heapq.nlargest(n, records, key=self.first)[::-1]
+                    self.assertEqual(verify, f(n, records, key=self.first))
+
+    @staticmethod
+    def first(record):
+        return record[0]
+
+    def test_key_called_once_per_item(self):
+        for f in self.functions:
+            calls = []
+
+            def key(record):
+                calls.append(record)
+                return self.key(record)
+
+            with self.subTest(function=f.__name__):
+                f(5, self.records, key=key)
+                self.assertEqual(len(self.records), len(calls))
+
+
+@unittest.skipIf(nlargest.numpy is None, 'numpy is not available')
+class TestArgpartition(unittest.TestCase):
+    def test_buffer_inputs(self):
+        verify = sorted(heapq.nlargest(5, unsorted))
+        inputs = {
+            'array': array.array('q', unsorted),
+            'memoryview': memoryview(array.array('q', unsorted)),
+            'ndarray': nlargest.numpy.array(unsorted),
+            'iterator': iter(unsorted),
+        }
+        for name, values in inputs.items():
+            with self.subTest(input=name):
+                self.assertEqual(
+                    verify, nlargest.nlargest_argpartition(5, values)
+                )
+
+    def test_indices(self):
+        indices = nlargest.nlargest_argpartition(5, unsorted, indices=True)
+        self.assertEqual(sorted(heapq.nlargest(5, unsorted)),
+                         [unsorted[i] for i in indices])
+
+    def test_pick_exceeds_length(self):
+        self.assertEqual(sorted(unsorted),
+                         nlargest.nlargest_argpartition(20, unsorted))
+        self.assertEqual(
+            sorted(range(len(unsorted)), key=unsorted.__getitem__),
+            nlargest.nlargest_argpartition(20, unsorted, indices=True)
+        )
+
+    def test_dispatch(self):
+        verify = sorted(heapq.nlargest(5, unsorted))
+        self.assertEqual(
+            verify, nlargest.nlargest(5, array.array('q', unsorted))
+        )
+
+    def test_bytes(self):
+        data = b'abcz'
+        verify = sorted(data)[-2:]
+        for f in (nlargest.nlargest, nlargest.nlargest_argpartition,
+                  nlargest.nlargest_chunked):
+            with self.subTest(function=f.__name__):
+                self.assertEqual(verify, f(2, data))
+
+    def test_non_numeric_input(self):
+        tuples = [(i % 3, i) for i in range(10)]
+        strings = nlargest.numpy.array(['b', 'a', 'c'])
+        for values in (tuples, strings):
+            with self.subTest(values=values):
+                with self.assertRaises(TypeError):
+                    nlargest.nlargest_argpartition(2, values)
+        self.assertEqual(sorted(tuples)[-2:], nlargest.nlargest(2, tuples))
+        self.assertEqual(['b', 'c'], nlargest.nlargest(2, strings))
+        self.assertEqual(['b', 'c'], nlargest.nlargest_chunked(2, strings))
+
+
+class TestChunked(unittest.TestCase):
+    def test_chunk_sizes(self):
+        verify = sorted(heapq.nlargest(5, unsorted))
+        for chunk_size in (1, 3, len(unsorted), 100):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(verify, nlargest.nlargest_chunked(
+                    5, iter(unsorted), chunk_size=chunk_size
+                ))
+
+    @unittest.skipIf(nlargest.numpy is None, 'numpy is not available')
+    def test_array_mask(self):
+        verify = sorted(heapq.nlargest(5, unsorted))
+        values = array.array('q', unsorted)
+        for chunk_size in (1, 3, 100):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(verify, nlargest.nlargest_chunked(
+                    5, values, chunk_size=chunk_size
+                ))
+
+    def test_short_input(self):
+        self.assertEqual(sorted(unsorted),
+                         nlargest.nlargest_chunked(20, iter(unsorted)))
+
+
+class TestSelect(unittest.TestCase):
+    inputs = {
+        'random': [random.randrange(10**6) for i in range(10**4)],
+        'duplicates': [random.randrange(10) for i in range(10**4)],
+        'ascending': list(range(10**4)),
+        'descending': list(range(10**4, 0, -1)),
+        'constant': [7] * 1000,
+    }
+
+    def test_picks(self):
+        for name, data in self.inputs.items():
+            for n in (1, 5, 100, len(data) // 10, len(data) - 1, len(data)):
+                with self.subTest(input=name, n=n):
+                    self.assertEqual(sorted(data)[len(data) - n:],
+                                     nlargest.nlargest_select(n, data))
+
+    def test_median_of_medians(self):
+        for name, data in self.inputs.items():
+            for k in (1, 100, len(data) // 2):
+                with self.subTest(input=name, k=k):
+                    self.assertEqual(
+                        sorted(data)[len(data) - k:],
+                        nlargest._select_largest(list(data), k, True)
+                    )
+
+    def test_short_input(self):
+        self.assertEqual(sorted(unsorted),
+                         nlargest.nlargest_select(20, iter(unsorted)))
+        self.assertEqual([], nlargest.nlargest_select(0, unsorted))
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        # Shard the short test input over several workers.
+        patcher = mock.patch.object(nlargest, 'SHARD_MIN_SIZE', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_shard_bounds(self):
+        self.assertEqual([(0, 4), (4, 7), (7, 10)],
+                         nlargest.shard_bounds(10, 3))
+        self.assertEqual([(0, 1), (1, 2)], nlargest.shard_bounds(2, 8))
+
+    def test_sequence(self):
+        verify = sorted(heapq.nlargest(5, unsorted))
+        self.assertEqual(verify, nlargest.parallel_nlargest(5, unsorted, 3))
+        self.assertEqual(verify, nlargest.parallel_nlargest(
+            5, unsorted, 2, kernel=nlargest.nlargest_list3
+        ))
+
+    @unittest.skipIf(nlargest.numpy is None, 'numpy is not available')
+    def test_shared_memory(self):
+        verify = sorted(heapq.nlargest(5, unsorted))
+        values = array.array('q', unsorted)
+        self.assertEqual(verify, nlargest.parallel_nlargest(5, values, 3))
+
+    def test_in_process(self):
+        values = list(range(100))
+        with mock.patch.object(nlargest, 'SHARD_MIN_SIZE', 40), \
+                mock.patch('concurrent.futures.ProcessPoolExecutor',
+                           wraps=concurrent.futures.ProcessPoolExecutor) \
+                as executor:
+            self.assertEqual([97, 98, 99],
+                             nlargest.parallel_nlargest(3, values, 32))
+            executor.assert_called_once_with(2)
+            executor.reset_mock()
+            self.assertEqual([76, 77, 78],
+                             nlargest.parallel_nlargest(3, values[:79], 32))
+            executor.assert_not_called()
+
+    @unittest.skipIf(nlargest.numpy is None, 'numpy is not available')
+    def test_short_shards(self):
+        values = array.array('q', unsorted)
+        for workers in (1, 5):
+            with self.subTest(workers=workers):
+                result = nlargest.parallel_nlargest(3, values, workers)
+                self.assertEqual(sorted(unsorted)[-3:], result)
+                self.assertEqual({int}, set(map(type, result)))
+
+
+class TestTopN(unittest.TestCase):
+    verify = sorted(heapq.nlargest(5, unsorted))
+
+    def test_push(self):
+        top = nlargest.TopN(5)
+        for i in unsorted:
+            top.push(i)
+        self.assertEqual(self.verify, top.result())
+
+    def test_extend_in_parts(self):
+        top = nlargest.TopN(5, unsorted[:3])
+        self.assertIsNone(top.threshold)
+        top.extend(iter(unsorted[3:]))
+        self.assertEqual(self.verify, top.result())
+        self.assertEqual(self.verify[0], top.threshold)
+
+    def test_merge(self):
+        left = nlargest.TopN(5, unsorted[:4])
+        right = nlargest.TopN(5, unsorted[4:])
+        self.assertEqual(self.verify, left.merge(right).result())
+
+    def test_pickle(self):
+        top = nlargest.TopN(5, unsorted)
+        restored = pickle.loads(pickle.dumps(top))
+        self.assertEqual(top.n, restored.n)
+        self.assertEqual(top.result(), restored.result())
+
+    def test_zero(self):
+        top = nlargest.TopN(0, unsorted)
+        top.push(1)
+        self.assertEqual([], top.result())
+
+
+class TestAsync(unittest.TestCase):
+    verify = sorted(heapq.nlargest(5, unsorted))
+
+    @staticmethod
+    async def produce(items):
+        for i in items:
+            await asyncio.sleep(0)
+            yield i
+
+    def test_anlargest(self):
+        result = asyncio.run(nlargest.anlargest(5, self.produce(unsorted)))
+        self.assertEqual(self.verify, result)
+
+    def test_batched(self):
+        batches = [unsorted[:3], unsorted[3:7], unsorted[7:]]
+        result = asyncio.run(
+            nlargest.anlargest(5, self.produce(batches), batched=True)
+        )
+        self.assertEqual(self.verify, result)
+
+    def test_short_stream(self):
+        result = asyncio.run(nlargest.anlargest(20, self.produce(unsorted)))
+        self.assertEqual(sorted(unsorted), result)
+
+    def test_accumulator_between_streams(self):
+        top = nlargest.TopN(5)
+        asyncio.run(top.aextend(self.produce(unsorted[:4])))
+        self.assertEqual(sorted(unsorted[:4]), top.result())
+        asyncio.run(top.aextend(self.produce(unsorted[4:])))
+        self.assertEqual(self.verify, top.result())
+
+
+class TestUnique(unittest.TestCase):
+    functions = [
+        getattr(nlargest, fun)
+        for fun in dir(nlargest)
+        if fun.startswith('nlargest_')
+        and 'unique' in inspect.signature(getattr(nlargest, fun)).parameters
+    ] + [nlargest.nlargest]
+    repeated = [random.randrange(20) for i in range(1000)] + [19] * 100
+    # (group, value) pairs with distinct values, where the best value of a
+    # group often arrives while the group is already retained.
+    records = [(random.randrange(30), value)
+               for value in random.sample(range(10**4), 1000)]
+
+    def test_distinct(self):
+        for f in self.functions:
+            for n in (1, 5, 20, 25):
+                with self.subTest(function=f.__name__, n=n):
+                    self.assertEqual(sorted(set(self.repeated))[-n:],
+                                     f(n, self.repeated, unique=True))
+
+    def test_distinct_by_key(self):
+        for f in self.functions:
+            with self.subTest(function=f.__name__):
+                self.assertEqual(sorted(set(self.repeated), reverse=True)[-5:],
+                                 f(5, self.repeated, key=lambda x: -x,
+                                   unique=True))
+
+    def test_best_per_key(self):
+        best = {}
+        for group, value in self.records:
+            best[group] = max(best.get(group, value), value)
+        for f in self.functions:
+            for n in (1, 5, 30, 40):
+                with self.subTest(function=f.__name__, n=n):
+                    verify = sorted((value, group)
+                                    for group, value in best.items())[-n:]
+                    self.assertEqual(
+                        [(group, value) for value, group in verify],
+                        f(n, self.records, key=lambda r: r[1],
+                          unique_key=lambda r: r[0])
+                    )
+
+    def test_rising_per_key(self):
+        # Every item improves the retained item of its group.
+        records = [(i % 50, i) for i in range(5000)]
+        for f in self.functions:
+            for n in (1, 20, 50, 60):
+                with self.subTest(function=f.__name__, n=n):
+                    self.assertEqual(
+                        records[-min(n, 50):],
+                        f(n, records, key=lambda r: r[1],
+                          unique_key=lambda r: r[0])
+                    )
+
+    def test_unique_key_without_key(self):
+        words = ['b', 'a', 'cc', 'ab', 'aaa', 'dd', 'bb']
+        for f in self.functions:
+            with self.subTest(function=f.__name__):
+                self.assertEqual(['b', 'dd'], f(2, words, unique_key=len))
+
+    def test_key_called_once_per_item(self):
+        for f in self.functions:
+            calls = []
+
+            def key(record):
+                calls.append(record)
+                return record[1]
+
+            with self.subTest(function=f.__name__):
+                f(5, self.records, key=key, unique_key=lambda r: r[0])
+                self.assertEqual(len(self.records), len(calls))
+
+    def test_zero(self):
+        for f in self.functions:
+            with self.subTest(function=f.__name__):
+                self.assertEqual([], f(0, self.repeated, unique=True))
+
+
+class TestSmallest(unittest.TestCase):
+    functions = [
+        getattr(nlargest, fun)
+        for fun in dir(nlargest) if fun.startswith('nsmallest')
+    ]
+    records = TestKey.records
+    repeated = [random.randrange(5) for i in range(100)]
+
+    def test_get_smallest(self):
+        for f in self.functions:
+            for n in (1, 5, len(unsorted), len(unsorted) + 1):
+                with self.subTest(function=f.__name__, n=n):
+                    self.assertEqual(heapq.nsmallest(n, unsorted),
+                                     f(n, unsorted))
+                    self.assertEqual(heapq.nsmallest(n, unsorted),
+                                     f(n, iter(unsorted)))
+
+    def test_get_smallest_by_key(self):
+        for f in self.functions:
+            with self.subTest(function=f.__name__):
+                self.assertEqual(heapq.nsmallest(5, self.records,
+                                                 key=TestKey.key),
+                                 f(5, self.records, key=TestKey.key))
+
+    def test_ties_keep_earliest(self):
+        records = list(enumerate(self.repeated))
+        for f in self.functions:
+            with self.subTest(function=f.__name__):
+                self.assertEqual(
+                    heapq.nsmallest(30, records, key=lambda r: r[1]),
+                    f(30, records, key=lambda r: r[1])
+                )
+
+    def test_zero(self):
+        for f in self.functions:
+            with self.subTest(function=f.__name__):
+                self.assertEqual([], f(0, unsorted))
+
+
+class TestExtremes(unittest.TestCase):
+    def test_extremes(self):
+        data = [random.randrange(100) for i in range(1000)]
+        for n in (1, 5, 500, 999, 1000, 1001):
+            with self.subTest(n=n):
+                self.assertEqual((sorted(data)[:n], sorted(data)[-n:]),
+                                 nlargest.nextremes(n, data))
+                self.assertEqual((sorted(data)[:n], sorted(data)[-n:]),
+                                 nlargest.nextremes(n, iter(data)))
+
+    def test_key(self):
+        key = TestKey.key
+        records = TestKey.records
+        self.assertEqual(
+            (heapq.nsmallest(3, records, key=key),
+             heapq.nlargest(3, records, key=key)[::-1]),
+            nlargest.nextremes(3, records, key=key)
+        )
+
+    def test_tied_keys(self):
+        records = [(i % 3, i) for i in range(30)]
+        key = TestKey.first
+        for n in (1, 5, 12):
+            with self.subTest(n=n):
+                self.assertEqual(
+                    (heapq.nsmallest(n, records, key=key),
+                     heapq.nlargest(n, records, key=key)[::-1]),
+                    nlargest.nextremes(n, records, key=key)
+                )
+
+    def test_key_called_once_per_item(self):
+        calls = []
+
+        def key(record):
+            calls.append(record)
+            return TestKey.key(record)
+
+        nlargest.nextremes(3, TestKey.records, key=key)
+        self.assertEqual(len(TestKey.records), len(calls))
+
+    def test_short_input(self):
+        self.assertEqual(([], []), nlargest.nextremes(0, unsorted))
+        self.assertEqual(([], []), nlargest.nextremes(3, []))
+        self.assertEqual(([7], [7]), nlargest.nextremes(3, [7]))
+
+
+class TestDispatcher(unittest.TestCase):
+    profile = nlargest.Profile(sort_ratio=0.5, list_max_pick=2)
+
+    def test_matches_heapq(self):
+        for n in (0, 1, 5, len(unsorted), len(unsorted) + 1):
+            with self.subTest(n=n):
+                verify = sorted(heapq.nlargest(n, unsorted))
+                self.assertEqual(verify, nlargest.nlargest(n, unsorted))
+                self.assertEqual(verify, nlargest.nlargest(n, iter(unsorted)))
+
+    def test_key(self):
+        verify = sorted(unsorted, key=lambda x: -x)[-3:]
+        self.assertEqual(verify,
+                         nlargest.nlargest(3, unsorted, key=lambda x: -x))
+        self.assertEqual(
+            verify, nlargest.nlargest(3, iter(unsorted), key=lambda x: -x)
+        )
+
+    def test_short_iterator(self):
+        self.assertEqual(sorted(unsorted),
+                         nlargest.nlargest(20, iter(unsorted)))
+
+    def test_tied_keys_across_strategies(self):
+        records = [(i % 3, i) for i in range(10000)]
+        key = TestKey.first
+        for n in (5, 20, 2000, 6000, 10000, 20000):
+            with self.subTest(n=n):
+                verify = heapq.nlargest(n, records, key=key)[::-1]
+                self.assertEqual(verify,
+                                 nlargest.nlargest(n, records, key=key))
+                self.assertEqual(
+                    verify, nlargest.nlargest(n, iter(records), key=key)
+                )
+
+    def test_choose_strategy(self):
+        choose = functools.partial(nlargest.choose_strategy,
+                                   profile=self.profile)
+        self.assertIs(nlargest.nlargest_ref_sorted, choose(5, 10))
+        self.assertIs(nlargest.nlargest_select, choose(5000, 10000))
+        self.assertIs(nlargest.nlargest_list3, choose(2, 10))
+        self.assertIs(nlargest.nlargest_heapreplace3, choose(3, 10))
+        self.assertIs(nlargest.nlargest_heapreplace3, choose(3))
+
+    def test_load_profile_without_select(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.ini')
+            with open(path, 'w') as f:
+                f.write('[Dispatch]\nsort_ratio = 0.5\nlist_max_pick = 2\n')
+            self.assertEqual(self.profile, nlargest.load_profile(path))
+
+    def test_load_missing_profile(self):
+        self.assertEqual(nlargest.DEFAULT_PROFILE,
+                         nlargest.load_profile('/nonexistent/profile.ini'))
+
+
 if __name__ == '__main__':
     unittest.main()
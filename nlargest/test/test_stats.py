@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+import math
+import unittest
+
+import stats
+
+
+class TestSummarize(unittest.TestCase):
+    times = [1.0, 2.0, 3.0, 4.0, 5.0]
+
+    def test_quartiles(self):
+        summary = stats.summarize(self.times)
+        self.assertEqual((3.0, 2.0, 4.0), summary[:3])
+
+    def test_confidence_interval(self):
+        summary = stats.summarize(self.times)
+        self.assertLessEqual(summary.ci_low, summary.median)
+        self.assertGreaterEqual(summary.ci_high, summary.median)
+        self.assertGreaterEqual(summary.ci_low, min(self.times))
+        self.assertLessEqual(summary.ci_high, max(self.times))
+
+    def test_reproducible(self):
+        self.assertEqual(stats.summarize(self.times),
+                         stats.summarize(self.times))
+
+    def test_constant(self):
+        self.assertEqual(stats.Summary(1.0, 1.0, 1.0, 1.0, 1.0),
+                         stats.summarize([1.0] * 5))
+
+    def test_empty(self):
+        self.assertTrue(all(map(math.isnan, stats.summarize(()))))
+
+
+class TestNoise(unittest.TestCase):
+    def test_relative_iqr(self):
+        self.assertAlmostEqual(2 / 3, stats.relative_iqr([1, 2, 3, 4, 5]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+import io
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+from benchmark import BenchmarkResult, TimeitResult
+from memory import MemoryResult
+import store
+
+
+results = [
+    BenchmarkResult('nlargest_list3', 10, TimeitResult(1000, 5, 2.5e-6)),
+    BenchmarkResult('nlargest_list3', 100, TimeitResult(100, 5, 2.5e-5),
+                    'ascending', 50),
+    BenchmarkResult('nlargest_list3', 1000,
+                    TimeitResult(10, 3, 2.5e-4, (2.5e-4, 3e-4, 2.6e-4))),
+    BenchmarkResult('nlargest_ref_sorted', 1000, TimeitResult(10, 5, 1e-4),
+                    memory=MemoryResult(8056, 0, 1)),
+]
+
+
+class TestResultStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'results')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, metadata=None):
+        with store.ResultWriter(self.path, metadata) as writer:
+            for result in results:
+                writer.append(result)
+
+    def load(self):
+        with open(self.path, 'rb') as f:
+            return store.load(f)
+
+    def test_roundtrip(self):
+        self.write({'config': 'test'})
+        metadata, records = self.load()
+        self.assertEqual({'config': 'test'}, metadata)
+        self.assertEqual(results, store.to_benchmark_results(records))
+
+    def test_columns(self):
+        self.write()
+        _, records = self.load()
+        self.assertEqual([10, 100, 1000, 1000],
+                         records['element_count'].tolist())
+        self.assertEqual(['random', 'ascending', 'random', 'random'],
+                         records['distribution'].tolist())
+
+    def test_statistics(self):
+        self.write()
+        _, records = self.load()
+        self.assertTrue(np.isnan(records['median'][0]))
+        self.assertEqual(2.6e-4, records['median'][2])
+        self.assertLessEqual(records['ci_low'][2], records['median'][2])
+
+    def test_memory(self):
+        self.write()
+        _, records = self.load()
+        self.assertTrue(np.isnan(records['memory_peak'][0]))
+        self.assertEqual(8056, records['memory_peak'][3])
+
+    def test_truncated_record(self):
+        self.write()
+        with open(self.path, 'rb+') as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        _, records = self.load()
+        self.assertEqual(results[:3], store.to_benchmark_results(records))
+
+    def test_refuses_overwrite(self):
+        self.write()
+        with self.assertRaises(FileExistsError):
+            store.ResultWriter(self.path)
+
+    def test_legacy_pickle(self):
+        legacy = [BenchmarkResult('f', 10, TimeitResult(1, 3, 0.5))]
+        data = pickle.dumps(legacy, protocol=0).replace(
+            b'cbenchmark\n', b'c__main__\n'
+        )
+        _, records = store.load(io.BytesIO(data))
+        self.assertEqual(legacy, store.to_benchmark_results(records))
+
+    def test_metadata(self):
+        metadata = store.run_metadata(extra=1)
+        self.assertEqual(1, metadata['extra'])
+        self.assertIn('python_version', metadata)
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_resume(self):
+        with store.ResultCache(self.path) as cache:
+            self.assertIsNone(cache.get('a'))
+            cache.put('a', TimeitResult(1000, 5, 2.5e-6))
+        with store.ResultCache(self.path) as cache:
+            self.assertEqual((TimeitResult(1000, 5, 2.5e-6), None),
+                             cache.get('a'))
+            cache.put('b', TimeitResult(100, 5, 2.5e-5),
+                      MemoryResult(4096, 0, 12))
+        with store.ResultCache(self.path) as cache:
+            self.assertEqual(2, len(cache))
+            self.assertEqual(MemoryResult(4096, 0, 12), cache.get('b')[1])
+
+    def test_truncated_line(self):
+        with store.ResultCache(self.path) as cache:
+            cache.put('a', TimeitResult(1000, 5, 2.5e-6))
+            cache.put('b', TimeitResult(100, 5, 2.5e-5))
+        with open(self.path, 'r+') as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        with store.ResultCache(self.path) as cache:
+            self.assertIn('a', cache)
+            self.assertNotIn('b', cache)
+            cache.put('c', TimeitResult(10, 5, 2.5e-4))
+        with store.ResultCache(self.path) as cache:
+            self.assertEqual(TimeitResult(10, 5, 2.5e-4), cache.get('c')[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+import contextlib
+import io
+import os
+import random
+import tempfile
+import unittest
+
+from summary import TopNSummary
+import summary
+
+
+random.seed(42)
+streams = [[random.randrange(10**6) for i in range(1000)] for j in range(4)]
+
+
+class TestTopNSummary(unittest.TestCase):
+    def test_summary(self):
+        s = TopNSummary(5, streams[0], key='latency_ms')
+        self.assertEqual(sorted(streams[0])[-5:], s.result())
+        self.assertEqual(1000, s.count)
+        self.assertEqual('latency_ms', s.key)
+
+    def test_count_iterator(self):
+        s = TopNSummary(5, iter(streams[0]))
+        s.extend(iter(streams[1][:10]))
+        self.assertEqual(1010, s.count)
+
+    def test_count_zero(self):
+        self.assertEqual(3, TopNSummary(0, iter([1, 2, 3])).count)
+
+    def test_round_trip(self):
+        for items in (streams[0], [x / 7 for x in streams[0]], []):
+            s = TopNSummary(10, items, key='value')
+            with self.subTest(items=items[:1]):
+                decoded = TopNSummary.from_bytes(s.to_bytes())
+                self.assertEqual(s, decoded)
+                self.assertEqual(
+                    [type(x) for x in s.result()],
+                    [type(x) for x in decoded.result()]
+                )
+
+    def test_round_trip_big_and_mixed(self):
+        for items in ([2**70, 5, -2**64, 2**63], [1, 2.5, 3, -7, 0.25]):
+            s = TopNSummary(4, items)
+            with self.subTest(items=items):
+                decoded = TopNSummary.from_bytes(s.to_bytes())
+                self.assertEqual(s, decoded)
+                self.assertEqual(
+                    [type(x) for x in s.result()],
+                    [type(x) for x in decoded.result()]
+                )
+
+    def test_not_numbers(self):
+        with self.assertRaises(TypeError):
+            TopNSummary(2, ['a', 'b']).to_bytes()
+
+    def test_encoding_is_compact(self):
+        s = TopNSummary(100, streams[0])
+        header = s.to_bytes().index(b'\n', len(summary.MAGIC)) + 1
+        self.assertEqual(100 * 8, len(s.to_bytes()) - header)
+
+    def test_not_a_summary(self):
+        with self.assertRaises(ValueError):
+            TopNSummary.from_bytes(b'NLARGEST-RESULTS 3\n{}\n')
+
+    def test_merge(self):
+        summaries = [TopNSummary(10, stream) for stream in streams]
+        merged = summary.merge(summaries)
+        union = [x for stream in streams for x in stream]
+        self.assertEqual(sorted(union)[-10:], merged.result())
+        self.assertEqual(len(union), merged.count)
+
+    def test_merge_is_associative_and_commutative(self):
+        a, b, c = (TopNSummary(10, stream) for stream in streams[:3])
+        self.assertEqual(a.merge(b).merge(c), a.merge(b.merge(c)))
+        self.assertEqual(a.merge(b), b.merge(a))
+
+    def test_merge_different_n(self):
+        merged = TopNSummary(10, streams[0]).merge(TopNSummary(3, streams[1]))
+        self.assertEqual(3, merged.n)
+        self.assertEqual(sorted(streams[0] + streams[1])[-3:], merged.result())
+
+    def test_merge_different_keys(self):
+        with self.assertRaises(ValueError):
+            TopNSummary(5, key='a').merge(TopNSummary(5, key='b'))
+
+
+class TestCLI(unittest.TestCase):
+    def test_merge_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for i, stream in enumerate(streams):
+                path = os.path.join(directory, 'host{}.topn'.format(i))
+                with open(path, 'wb') as f:
+                    TopNSummary(10, stream, key='latency_ms').dump(f)
+            output = os.path.join(directory, 'merged')
+            with contextlib.redirect_stdout(io.StringIO()):
+                summary.main([directory, '--output', output])
+            with open(output, 'rb') as f:
+                merged = TopNSummary.load(f)
+        union = [x for stream in streams for x in stream]
+        self.assertEqual(sorted(union)[-10:], merged.result())
+        self.assertEqual(len(union), merged.count)
+        self.assertEqual('latency_ms', merged.key)
+
+    def test_empty_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(SystemExit):
+                summary.main([directory])
+
+
+if __name__ == '__main__':
+    unittest.main()
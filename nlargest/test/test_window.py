@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+import random
+import unittest
+
+import window
+
+
+random.seed(42)
+stream = [random.randrange(0, 50) for i in range(500)]
+
+
+class TestSlidingTopN(unittest.TestCase):
+    def test_against_recomputation(self):
+        for n, size in ((1, 1), (3, 10), (5, 7), (5, 100)):
+            top = window.SlidingTopN(n, size)
+            with self.subTest(n=n, size=size):
+                for i, item in enumerate(stream):
+                    top.push(item)
+                    verify = sorted(stream[max(0, i + 1 - size):i + 1])[-n:]
+                    self.assertEqual(verify, top.result())
+                    self.assertEqual(
+                        verify[0] if len(verify) == n else None, top.threshold
+                    )
+
+    def test_bounded_heaps(self):
+        top = window.SlidingTopN(5, 20)
+        top.extend(range(10000))
+        self.assertEqual(20, len(top))
+        self.assertLessEqual(len(top._top) + len(top._rest), 2 * 20 + 5)
+
+    def test_zero(self):
+        top = window.SlidingTopN(0, 5)
+        top.extend([3, 1, 4])
+        self.assertIsNone(top.threshold)
+        self.assertEqual([], top.result())
+
+
+class TestTimedTopN(unittest.TestCase):
+    def test_expiry(self):
+        now = [0]
+        top = window.TimedTopN(2, 10, clock=lambda: now[0])
+        for timestamp, item in enumerate([5, 9, 1, 7, 3]):
+            top.push(item, timestamp * 4)
+        # Items at t = 8, 12, 16 remain at t = 16, the latest timestamp,
+        # regardless of the clock.
+        now[0] = 1000
+        self.assertEqual([3, 7], top.result())
+        top.expire(23)
+        self.assertEqual([3], top.result())
+        self.assertIsNone(top.threshold)
+
+    def test_event_time(self):
+        top = window.TimedTopN(2, 600)
+        for item, timestamp in ((5, 1000.0), (7, 1001.0), (3, 1002.0)):
+            top.push(item, timestamp)
+        self.assertEqual([5, 7], top.result())
+        self.assertEqual(5, top.threshold)
+        top.push(1, 1600.5)
+        self.assertEqual([3, 7], top.result())
+
+    def test_mixed_clocks(self):
+        top = window.TimedTopN(2, 10, clock=lambda: 0)
+        top.push(1, 5)
+        with self.assertRaises(ValueError):
+            top.push(2)
+        top = window.TimedTopN(2, 10, clock=lambda: 0)
+        top.extend([1, 2])
+        with self.assertRaises(ValueError):
+            top.push(3, 5)
+
+    def test_default_clock(self):
+        now = [100]
+        top = window.TimedTopN(3, 5, clock=lambda: now[0])
+        top.extend([4, 8, 6, 2])
+        self.assertEqual([4, 6, 8], top.result())
+        now[0] = 105
+        self.assertEqual([], top.result())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Sliding-window variants of the n largest items of a stream, over either the
+last `size` items or the items of the last `duration` seconds."""
+import collections
+import heapq
+import itertools
+import time
+
+
+# Locations of a window entry.
+TOP, REST, DEAD = range(3)
+
+
+def _heappush_max(heap, item):
+    """Push an item onto a max-heap maintained by heapq's max-heap helpers."""
+    heap.append(item)
+    heapq._siftdown_max(heap, 0, len(heap) - 1)
+
+
+class SlidingTopN:
+    """The n largest of the last `size` items pushed.
+
+    Every item in the window is kept as an entry [item, seq, location], where
+    the sequence number breaks ties in favour of newer items, which stay in
+    the window longer. The n largest live entries are held in the min-heap
+    `_top`, like in nlargest.TopN, and the remaining live entries in the
+    max-heap `_rest`. Expired entries are only marked as dead and dropped once
+    they surface at a heap root, so eviction costs O(log W) instead of a
+    rescan of the window. When a member of the top n expires, the largest
+    live entry of `_rest` takes its place.
+    """
+
+    def __init__(self, n, size=None):
+        self.n = n
+        self.size = size
+        self._window = collections.deque()
+        self._top = []
+        self._rest = []
+        self._top_live = 0
+        self._top_dead = 0
+        self._rest_dead = 0
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._window)
+
+    def push(self, item):
+        """Add an item, evicting the oldest one if the window is full."""
+        self._insert(item)
+        if self.size is not None and len(self._window) > self.size:
+            self._evict(self._window.popleft())
+
+    def extend(self, iterable):
+        """Add all items from an iterable."""
+        for item in iterable:
+            self.push(item)
+
+    @property
+    def threshold(self):
+        """The smallest item among the current n largest, or None while the
+        window holds fewer than n items, or for n = 0."""
+        if self.n <= 0 or self._top_live < self.n:
+            return None
+        self._clean_top()
+        return self._top[0][0]
+
+    def result(self):
+        """Return the n largest items in the window in ascending order."""
+        return sorted(entry[0] for entry in self._top if entry[2] == TOP)
+
+    def _insert(self, item):
+        entry = [item, next(self._seq), TOP]
+        self._window.append(entry)
+        if self._top_live < self.n:
+            heapq.heappush(self._top, entry)
+            self._top_live += 1
+            return
+        if self.n <= 0:
+            entry[2] = REST
+            _heappush_max(self._rest, entry)
+            return
+        self._clean_top()
+        if entry > self._top[0]:
+            entry = heapq.heapreplace(self._top, entry)
+            entry[2] = REST
+        else:
+            entry[2] = REST
+        _heappush_max(self._rest, entry)
+
+    def _evict(self, entry):
+        location, entry[2] = entry[2], DEAD
+        if location == REST:
+            self._rest_dead += 1
+            if self._rest_dead > len(self._rest) // 2:
+                self._rest = [e for e in self._rest if e[2] == REST]
+                heapq._heapify_max(self._rest)
+                self._rest_dead = 0
+            return
+
+        self._top_live -= 1
+        self._top_dead += 1
+        self._clean_rest()
+        if self._rest:
+            replacement = heapq._heappop_max(self._rest)
+            replacement[2] = TOP
+            heapq.heappush(self._top, replacement)
+            self._top_live += 1
+        if self._top_dead > self.n:
+            self._top = [e for e in self._top if e[2] == TOP]
+            heapq.heapify(self._top)
+            self._top_dead = 0
+
+    def _clean_top(self):
+        """Drop dead entries from the root of the top n heap."""
+        top = self._top
+        while top and top[0][2] == DEAD:
+            heapq.heappop(top)
+            self._top_dead -= 1
+
+    def _clean_rest(self):
+        """Drop dead entries from the root of the remainder heap."""
+        rest = self._rest
+        while rest and rest[0][2] == DEAD:
+            heapq._heappop_max(rest)
+            self._rest_dead -= 1
+
+
+class TimedTopN(SlidingTopN):
+    """The n largest of the items pushed during the last `duration` seconds.
+
+    Items are pushed either all with explicit timestamps, e.g. event times, or
+    all without, in which case they are stamped with `clock()`. Timestamps
+    have to be non-decreasing. Queries expire items relative to the latest
+    explicit timestamp, or to the current clock.
+    """
+
+    def __init__(self, n, duration, clock=time.monotonic):
+        super().__init__(n)
+        self.duration = duration
+        self.clock = clock
+        self._timestamps = collections.deque()
+        self._explicit = None
+        self._latest = None
+
+    def push(self, item, timestamp=None):
+        """Add an item seen at the given time, evicting expired items."""
+        self._push(item, self._stamp(timestamp))
+
+    def extend(self, iterable, timestamp=None):
+        """Add all items from an iterable with a common timestamp."""
+        timestamp = self._stamp(timestamp)
+        for item in iterable:
+            self._push(item, timestamp)
+
+    def _push(self, item, timestamp):
+        self._insert(item)
+        self._timestamps.append(timestamp)
+        self.expire(timestamp)
+
+    def _stamp(self, timestamp):
+        """Return the timestamp of a push, refusing to mix explicit
+        timestamps with the clock."""
+        explicit = timestamp is not None
+        if self._explicit is None:
+            self._explicit = explicit
+        elif explicit != self._explicit:
+            raise ValueError('cannot mix explicit timestamps with the clock')
+        if not explicit:
+            timestamp = self.clock()
+        self._latest = timestamp
+        return timestamp
+
+    def now(self):
+        """The time queries expire items against."""
+        if self._explicit:
+            return self._latest
+        return self.clock()
+
+    def expire(self, now=None):
+        """Evict all items older than `duration` seconds before `now`, by
+        default now()."""
+        if now is None:
+            now = self.now()
+        cutoff = now - self.duration
+        timestamps = self._timestamps
+        while timestamps and timestamps[0] <= cutoff:
+            timestamps.popleft()
+            self._evict(self._window.popleft())
+
+    @property
+    def threshold(self):
+        self.expire()
+        return super().threshold
+
+    def result(self):
+        self.expire()
+        return super().result()